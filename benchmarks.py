@@ -0,0 +1,286 @@
+# Headless benchmarks for hud_components, colors and fonts.
+#
+#   python benchmarks.py                          run everything, print a table
+#   python benchmarks.py --filter bar --counts 100
+#   python benchmarks.py --save bench_baseline.json
+#   python benchmarks.py --compare bench_baseline.json
+#
+# Each case is run at 1/100/10k instances and reports the median time per frame, the Python memory
+# blocks a frame allocates and keeps, the peak of the memory it allocates (short-lived allocations
+# included), and the Surfaces, Fonts and text renders it had to create (pool and cache misses).
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import argparse
+import gc
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pygame
+from pygame import Surface
+
+pygame.display.init()
+pygame.display.set_mode((1280, 720))
+
+import colors
+import fonts
+import hud_components as hud
+
+SCREEN = (1280, 720)
+cases = {} # name -> setup(n) returning a callable that runs one frame
+
+def case(name:str):
+    def register(setup):
+        cases[name] = setup
+        return setup
+    return register
+
+def grid_pos(i:int, size:tuple) -> tuple:
+    columns = max(1, SCREEN[0]//size[0])
+    return ((i % columns)*size[0], (i//columns % (SCREEN[1]//size[1]))*size[1])
+
+
+#-- HUD COMPONENTS --#
+@case('button.draw')
+def button_draw(n:int):
+    target = Surface(SCREEN)
+    buttons = [hud.Button(f"Button {i}", grid_pos(i, (120, 40)), 118, 38, colors.white, colors.midnight, colors.grey, None, None) for i in range(n)]
+    def frame():
+        for b in buttons: b.draw(target)
+    return frame
+
+@case('button.draw.hover')
+def button_draw_hover(n:int):
+    target = Surface(SCREEN)
+    buttons = [hud.Button(f"Button {i}", grid_pos(i, (120, 40)), 118, 38, colors.white, colors.midnight, colors.grey, None, None) for i in range(n)]
+    tick = [0]
+    def frame():
+        tick[0] += 1
+        for b in buttons:
+            b.hovering = tick[0] % 2 == 0
+            b.pressed = tick[0] % 4 == 0
+            b.draw(target)
+    return frame
+
+@case('button.update')
+def button_update(n:int):
+    buttons = [hud.Button(f"Button {i}", grid_pos(i, (120, 40)), 118, 38, colors.white, colors.midnight, colors.grey, None, None) for i in range(n)]
+    def frame():
+        for b in buttons: b.update(1/60)
+    return frame
+
+def textbox_frame(n:int, auto_txt_resize:bool):
+    target = Surface(SCREEN)
+    tick = [0]
+    boxes = [hud.TextBox(lambda: f"score {tick[0]*7}", grid_pos(i, (160, 40)), 158, 38, colors.white, colors.black, colors.grey, auto_txt_resize) for i in range(n)]
+    def frame():
+        tick[0] += 1
+        for box in boxes: box.draw(target)
+    return frame
+
+@case('textbox.draw')
+def textbox_draw(n:int):
+    return textbox_frame(n, True)
+
+@case('textbox.draw.no_resize')
+def textbox_draw_no_resize(n:int):
+    return textbox_frame(n, False)
+
+def bar_frame(anchor:str, direction:str, split:bool):
+    def setup(n:int):
+        target = Surface(SCREEN)
+        bars = [hud.Bar(grid_pos(i, (110, 20)), (100, 12), 100, 50, anchor, direction, split, fill_color=colors.grass) for i in range(n)]
+        tick = [0]
+        def frame():
+            tick[0] += 1
+            for b in bars:
+                b.set_curr_value(tick[0] % 100)
+                b.draw(target)
+        return frame
+    return setup
+
+for anchor in hud.Bar.bar_anchors:
+    for direction in hud.Bar.fill_directions:
+        for split in [False, True]:
+            case(f"bar.draw.{anchor}.{direction}{'.split' if split else ''}")(bar_frame(anchor, direction, split))
+
+@case('barbatch.draw')
+def barbatch_draw(n:int):
+    target = Surface(SCREEN)
+    batch = hud.BarBatch(n)
+    for i in range(n):
+        batch.add(grid_pos(i, (110, 20)), (100, 12), 100, 50, fill_color=colors.grass)
+    tick = [0]
+    def frame():
+        tick[0] += 1
+        batch.value[:batch.count] = tick[0] % 100
+        batch.draw(target)
+    return frame
+
+def camera_frame(world_size:int, tiled:bool=False, zoom:bool=False):
+    def setup(n:int):
+        window = Surface(SCREEN)
+        if tiled:
+            world = hud.TiledWorld(world_size, world_size, lambda chunk, rect: chunk.fill(((rect.x//7) % 256, (rect.y//7) % 256, 90)))
+        else:
+            world = Surface((world_size, world_size))
+            world.fill(colors.grass)
+        cameras = [hud.Camera(0, 0, 320, 240, world) for _ in range(n)]
+        tick = [0]
+        def frame():
+            tick[0] += 1
+            for i, cam in enumerate(cameras):
+                cam.left = (tick[0]*13 + i*31) % (world_size - cam.width)
+                cam.top = (tick[0]*7 + i*17) % (world_size - cam.height)
+                if zoom: cam.zoom = 0.3 + (tick[0] % 20)/10
+                cam.draw(window)
+        return frame
+    return setup
+
+for size in [1024, 4096]:
+    case(f"camera.draw.{size}")(camera_frame(size))
+case("camera.draw.tiled.16384")(camera_frame(16384, True))
+case("camera.draw.4096.zoom")(camera_frame(4096, zoom=True))
+case("camera.draw.tiled.16384.zoom")(camera_frame(16384, True, True))
+
+
+#-- FONTS --#
+@case('fonts.txt_size')
+def fonts_txt_size(n:int):
+    def frame():
+        for i in range(n): fonts.txt_size(8 + i % 48)
+    return frame
+
+@case('fonts.txt_size.cold')
+def fonts_txt_size_cold(n:int):
+    def frame():
+        fonts.font_cache.clear()
+        for i in range(n): fonts.txt_size(8 + i % 48)
+    return frame
+
+
+#-- COLORS --#
+def color_list(n:int) -> list:
+    return [((i*37) % 255 + 1, (i*91) % 256, (i*53) % 256, 255) for i in range(n)]
+
+def color_frame(func, *args):
+    def setup(n:int):
+        cs = color_list(n)
+        def frame():
+            for c in cs: func(c, *args)
+        return frame
+    return setup
+
+def color_array_frame(func, *args):
+    def setup(n:int):
+        cs = colors.np.array(color_list(n), dtype=colors.np.uint8)
+        return lambda: func(cs, *args)
+    return setup
+
+for name, func, args in [('lighten', colors.lighten, ()), ('darken', colors.darken, ()),
+                         ('contrast_dark_light', colors.contrast_dark_light, ()), ('contrast_color', colors.contrast_color, ()),
+                         ('max_bright', colors.max_bright, ()), ('step_to', colors.step_to, (colors.midnight,)),
+                         ('get_luminance', colors.get_luminance, ())]:
+    case(f"colors.{name}")(color_frame(func, *args))
+    if colors.np is not None:
+        case(f"colors.{name}_array")(color_array_frame(getattr(colors, f"{name}_array"), *args))
+
+
+#-- RUNNER --#
+def measure(setup, n:int, frames:int) -> dict:
+    frame = setup(n)
+    frame() # first frame builds caches, it is not counted
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        frame()
+        times.append(time.perf_counter() - start)
+
+    # one more frame under tracemalloc, traced from before the baseline so every block the frame
+    # allocates is seen, plus the surfaces, fonts and text the frame had to create
+    gc.collect()
+    tracemalloc.start()
+    before = _snapshot()
+    created = _created()
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    frame()
+    peak = tracemalloc.get_traced_memory()[1] - start
+    created = [now - then for now, then in zip(_created(), created)]
+    diff = _snapshot().compare_to(before, 'lineno')
+    tracemalloc.stop()
+    return {
+        'ms_per_frame': statistics.median(times)*1000,
+        'mean_ms': statistics.fmean(times)*1000,
+        'new_blocks': sum(max(0, stat.count_diff) for stat in diff), # allocated this frame and still alive
+        'peak_kb': peak/1024, # high-water mark of the frame's allocations, short-lived ones included
+        'surfaces': created[0],
+        'fonts': created[1],
+        'text_renders': created[2],
+    }
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+# Pool and cache misses so far: new Surfaces, Fonts and rendered text surfaces.
+def _created() -> tuple:
+    return (hud.surface_pool.misses, fonts.font_cache.misses, fonts.text_cache.misses)
+
+def run(names:list, counts:list, frames:int) -> dict:
+    results = {}
+    print(f"{'case':<40}{'n':>7}{'ms/frame':>12}{'new blocks':>12}{'peak KB':>10}{'surfaces':>10}{'fonts':>7}{'texts':>7}")
+    for name in names:
+        for n in counts:
+            r = measure(cases[name], n, frames)
+            results[f"{name}[{n}]"] = r
+            print(f"{name:<40}{n:>7}{r['ms_per_frame']:>12.3f}{r['new_blocks']:>12}{r['peak_kb']:>10.1f}{r['surfaces']:>10}{r['fonts']:>7}{r['text_renders']:>7}")
+    return results
+
+def compare(results:dict, baseline:dict, threshold:float) -> list:
+    regressions = []
+    print(f"\n{'case':<48}{'baseline ms':>12}{'now ms':>10}{'ratio':>8}")
+    for key, r in results.items():
+        if key not in baseline: continue
+        before = baseline[key]['ms_per_frame']
+        ratio = r['ms_per_frame']/before if before > 0 else 1.0
+        flag = ''
+        if ratio > threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print(f"{key:<48}{before:>12.3f}{r['ms_per_frame']:>10.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+def main(argv:list=None) -> int:
+    parser = argparse.ArgumentParser(description="Headless benchmarks for the UI kit.")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this")
+    parser.add_argument('--counts', default='1,100,10000', help="comma separated instance counts")
+    parser.add_argument('--frames', type=int, default=10, help="timed frames per case")
+    parser.add_argument('--save', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="compare against a JSON file written by --save")
+    parser.add_argument('--threshold', type=float, default=1.25, help="slowdown ratio reported as a regression")
+    parser.add_argument('--list', action='store_true', help="list the case names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(cases))
+        return 0
+    names = [name for name in cases if args.filter in name]
+    counts = [int(n) for n in args.counts.split(',')]
+    results = run(names, counts, args.frames)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'pygame': pygame.version.ver, 'python': sys.version.split()[0], 'results': results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold): return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,11 @@
 from __future__ import annotations
 import pygame
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 class Color(pygame.Color):
     def __init__(self, *args):
@@ -167,3 +173,144 @@ def get_luminance(color:Color) -> float:
     return luminance
 
 
+#-- DERIVED COLOR CACHE --#
+# Colors as interned rgba tuples: immutable, and equal colors share one tuple object.
+interned:dict = {}
+interned_max = 4096
+
+def freeze(color:Color|tuple) -> tuple:
+    if callable(color): color = color()
+    if isinstance(color, tuple) and len(color) == 4: c = color
+    elif isinstance(color, (tuple,list)) and len(color) == 3: c = (*color, 255)
+    elif isinstance(color, list) and len(color) == 4: c = tuple(color)
+    elif isinstance(color, pygame.Color): c = tuple(pygame.Color(color))
+    else: raise TypeError(f"Invalid color: {color}")
+    frozen = interned.get(c)
+    if frozen is None:
+        if len(interned) >= interned_max: interned.clear()
+        interned[c] = frozen = c
+    return frozen
+
+# Bounded memo of derived colors, ex. memo(contrast_dark_light, color). Color arguments are keyed
+# by their frozen rgba value, so repeated hover/pressed colors cost a dict lookup.
+class ColorMemo():
+    def __init__(self, max_size:int=1024):
+        self.max_size = max_size
+        self._colors:OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __call__(self, func, *args, **kwargs) -> tuple:
+        args = tuple(freeze(a) if callable(a) or isinstance(a, (tuple,list,pygame.Color)) else a for a in args)
+        key = (func, args, tuple(kwargs.items()))
+        c = self._colors.get(key)
+        if c is not None:
+            self.hits += 1
+            self._colors.move_to_end(key)
+            return c
+        self.misses += 1
+        c = freeze(func(*args, **kwargs))
+        self._colors[key] = c
+        if len(self._colors) > self.max_size:
+            self._colors.popitem(last=False)
+            self.evictions += 1
+        return c
+
+    def clear(self):
+        self._colors.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._colors),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits/lookups if lookups else 0.0,
+        }
+
+derived_cache = ColorMemo()
+
+def derived(func, *args, **kwargs) -> tuple:
+    return derived_cache(func, *args, **kwargs)
+
+
+#-- ARRAY VERSIONS --#
+# Same transforms as above applied to a whole array of colors at once: an (N,3|4) uint8 array
+# (palettes, gradients, per-entity colors) or a pygame.surfarray.pixels3d() view of a surface.
+# Each returns a new uint8 array, or writes into out (which may be the input itself).
+def _as_array(colors) -> np.ndarray:
+    if np is None:
+        raise ImportError("The array color functions require numpy.")
+    a = np.asarray(colors)
+    if a.shape[-1] not in [3,4]:
+        raise ValueError(f"Expected colors with 3 or 4 channels in the last axis. Given shape: {a.shape}")
+    return a
+
+def _store(a:np.ndarray, values:np.ndarray, channels:int=3, out:np.ndarray=None) -> np.ndarray:
+    if out is None: out = a.astype(np.uint8, copy=True)
+    out[..., :channels] = values
+    return out
+
+def _rgba(a:np.ndarray) -> np.ndarray:
+    if a.shape[-1] == 4: return a
+    return np.concatenate([a, np.full(a.shape[:-1] + (1,), 255, dtype=a.dtype)], axis=-1)
+
+def get_luminance_array(colors) -> np.ndarray:
+    a = _as_array(colors)
+    rgb = a[..., :3] / 255
+    return 0.2126*rgb[..., 0] + 0.7152*rgb[..., 1] + 0.0722*rgb[..., 2]
+
+def lighten_array(colors, norm_percent:float=0.5, out:np.ndarray=None) -> np.ndarray:
+    a = _as_array(colors)
+    if not (norm_percent > 0 and norm_percent <= 1):
+        print(f"lighten_array() requires a norm_percent value in range (0.0 - 1.0). Given value: {norm_percent}")
+        return _store(a, a[..., :3], out=out)
+    return _store(a, np.trunc((255 - a[..., :3].astype(np.float64)) * norm_percent), out=out)
+
+def darken_array(colors, norm_percent:float=0.5, out:np.ndarray=None) -> np.ndarray:
+    a = _as_array(colors)
+    if not (norm_percent > 0 and norm_percent <= 1):
+        print(f"darken_array() requires a norm_percent value in range (0.0 - 1.0). Given value: {norm_percent}")
+        return _store(a, a[..., :3], out=out)
+    return _store(a, np.trunc(a[..., :3] * norm_percent), out=out)
+
+def contrast_dark_light_array(colors, out:np.ndarray=None) -> np.ndarray:
+    a = _as_array(colors)
+    n = np.where(get_luminance_array(a) < 0.5, 1.5, 0.5)[..., np.newaxis]
+    return _store(a, np.trunc(np.clip(a[..., :3] * n, 0, 255)), out=out)
+
+def contrast_color_array(colors, out:np.ndarray=None) -> np.ndarray:
+    a = _as_array(colors)
+    return _store(a, (a[..., :3].astype(np.int16) - int(255/3)) % 256, out=out)
+
+def max_bright_array(colors, out:np.ndarray=None) -> np.ndarray:
+    a = _as_array(colors)
+    max_c = a[..., :3].max(axis=-1, keepdims=True).astype(np.float64)
+    # black has no brightest channel to scale up, it is left as is
+    scale = np.divide(255, max_c, out=np.ones_like(max_c), where=max_c > 0)
+    return _store(a, np.trunc(a[..., :3] * scale), out=out)
+
+# Like step_to(), alpha steps too and a 3 channel color counts as alpha 255. A single color on
+# either side is stepped against every color on the other.
+def step_to_array(from_colors, to_colors, luminance_only=False, out:np.ndarray=None) -> np.ndarray:
+    fa = _as_array(from_colors)
+    channels = fa.shape[-1]
+    fa, ta = np.broadcast_arrays(_rgba(fa), _rgba(_as_array(to_colors)))
+    if luminance_only:
+        avg = ((get_luminance_array(fa) + get_luminance_array(ta)) / 2)[..., np.newaxis]
+        values = np.trunc(fa * avg)
+    else:
+        fc = fa.astype(np.int16)
+        values = fc + np.trunc((ta - fc) / 2)
+    return _store(fa[..., :channels], values[..., :channels], channels, out)
+
+# Recolors a whole surface in place with one of the array functions above,
+# ex. recolor_surface(surface, step_to_array, midnight).
+def recolor_surface(surface:pygame.Surface, func, *args, **kwargs) -> pygame.Surface:
+    pixels = pygame.surfarray.pixels3d(surface)
+    func(pixels, *args, out=pixels, **kwargs)
+    del pixels # unlocks the surface
+    return surface
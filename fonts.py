@@ -2,19 +2,338 @@ import pygame
 from pygame.locals import *
 import pygame.font as font
 
-pygame.font.init()
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import string
+import threading
+
+# Guards the shared caches below, so prewarm() can fill them from worker threads. Fonts are created
+# and text is rendered outside of it, so the main thread never waits on a worker's rendering.
+lock = threading.RLock()
+
+
+class FontCache():
+    # Process-wide registry of Font objects keyed by (name, size, bold, italic).
+    # Widgets asking for the same font share one Font instead of each calling SysFont.
+    def __init__(self, max_size:int=64):
+        self.max_size = max_size
+        self._fonts:OrderedDict = OrderedDict()
+        self._paths:dict = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, name:str, size:int, bold=False, italic=False) -> font.Font:
+        key = (name, int(size), bool(bold), bool(italic))
+        with lock:
+            f = self._fonts.get(key)
+            if f is not None:
+                self.hits += 1
+                self._fonts.move_to_end(key)
+                return f
+            self.misses += 1
+        f = self._create(*key)
+        with lock:
+            # another thread may have created the same font meanwhile, keep the first one
+            f = self._fonts.setdefault(key, f)
+            while len(self._fonts) > self.max_size:
+                self._fonts.popitem(last=False)
+                self.evictions += 1
+        return f
+
+    # Returns (path, fake_bold, fake_italic) the way SysFont would resolve them. Cached, so the
+    # system font list is only searched once per (name, bold, italic).
+    def resolve(self, name:str, bold=False, italic=False) -> tuple:
+        key = (name, bool(bold), bool(italic))
+        path = self._paths.get(key)
+        if path is None:
+            with lock:
+                path = font.SysFont(name, 1, bold, italic, constructor=lambda path, size, b, i: (path, b, i))
+                self._paths[key] = path
+        return path
+
+    def preload_paths(self, names:list, styles:list=((False, False), (True, False), (False, True), (True, True))):
+        for name in names:
+            for bold, italic in styles:
+                self.resolve(name, bold, italic)
+
+    def clear(self):
+        with lock:
+            self._fonts.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._fonts),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits/lookups if lookups else 0.0,
+        }
+
+    def _create(self, name:str, size:int, bold:bool, italic:bool) -> font.Font:
+        if not font.get_init(): font.init()
+        path, fake_bold, fake_italic = self.resolve(name, bold, italic)
+        f = font.Font(path, size)
+        if fake_bold: f.set_bold(True)
+        if fake_italic: f.set_italic(True)
+        return f
+
+font_cache = FontCache()
+
+
+class TextCache():
+    # Rendered text surfaces keyed by (font, text, antialias, color, background). Least recently
+    # used surfaces are dropped once the cache holds more than max_bytes of pixels.
+    # The surfaces are shared between callers, so blit them but don't draw on them.
+    def __init__(self, max_bytes:int=16*1024*1024):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._surfaces:OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def render(self, f:font.Font, txt:str, antialias:bool, color, background=None) -> pygame.Surface:
+        key = (id(f), txt, bool(antialias), rgba(color), None if background is None else rgba(background))
+        with lock:
+            entry = self._surfaces.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._surfaces.move_to_end(key)
+                return entry[1]
+            self.misses += 1
+        if background is None: surf = f.render(txt, antialias, color)
+        else: surf = f.render(txt, antialias, color, background)
+        n = surf.get_pitch() * surf.get_height()
+        with lock:
+            entry = self._surfaces.get(key)
+            if entry is not None: return entry[1]
+            # the entry holds on to the font so its id can't be reused by another font while cached
+            self._surfaces[key] = (f, surf, n)
+            self.bytes += n
+            while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+                _, (_, _, evicted) = self._surfaces.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+        return surf
+
+    def clear(self):
+        with lock:
+            self._surfaces.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._surfaces),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits/lookups if lookups else 0.0,
+        }
+
+text_cache = TextCache()
+
+def render(f:font.Font, txt:str, antialias:bool, color, background=None) -> pygame.Surface:
+    return text_cache.render(f, txt, antialias, color, background)
+
+def rgba(color) -> tuple:
+    if isinstance(color, tuple) and len(color) == 4: return color
+    return tuple(pygame.Color(color))
+
+
+class GlyphAtlas():
+    # Glyphs of one (font, color, antialias) rendered once and packed side by side into one surface.
+    # Strings are assembled from it with a single Surface.blits() call, stepping by each glyph's
+    # width, so text that changes every frame (fps, timers, ammo counts) never calls font.render.
+    # Kerning between glyphs isn't applied. Characters missing from charset are rendered on first use.
+    charset = string.digits + string.punctuation + string.ascii_letters + ' '
+
+    def __init__(self, f:font.Font, color, antialias:bool=True, charset:str=None):
+        self.font = f
+        self.color = rgba(color)
+        self.antialias = antialias
+        glyphs = [(ch, f.render(ch, antialias, self.color)) for ch in (charset or self.charset)]
+        self.height = f.get_height()
+        self.surface = pygame.Surface((max(1, sum(g.get_width() for _, g in glyphs)), self.height), pygame.SRCALPHA)
+        self._glyphs:dict = {} # character -> (surface, area or None, advance)
+        x = 0
+        for ch, g in glyphs:
+            # BLEND_RGBA_MAX onto the transparent atlas copies the glyph's pixels as they are
+            self.surface.blit(g, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self._glyphs[ch] = (pygame.Rect(x, 0, g.get_width(), g.get_height()), g.get_width())
+            x += g.get_width()
+        # blits from an atlas in the display's pixel format are cheaper
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+        self._glyphs = {ch: (self.surface, area, advance) for ch, (area, advance) in self._glyphs.items()}
+
+    def glyph(self, ch:str) -> tuple:
+        g = self._glyphs.get(ch)
+        if g is None:
+            surf = self.font.render(ch, self.antialias, self.color)
+            g = self._glyphs[ch] = (surf, None, surf.get_width())
+        return g
+
+    def size(self, txt:str) -> tuple:
+        return (sum(self.glyph(ch)[2] for ch in txt), self.height)
+
+    def blits(self, txt:str, pos:tuple) -> list:
+        x, y = pos
+        glyphs = self._glyphs
+        blits = []
+        for ch in txt:
+            surf, area, advance = glyphs.get(ch) or self.glyph(ch)
+            blits.append((surf, (x, y), area))
+            x += advance
+        return blits
+
+    def blit_text(self, target:pygame.Surface, txt:str, pos:tuple):
+        target.blits(self.blits(txt, pos), False)
+
+    def render(self, txt:str) -> pygame.Surface:
+        surf = pygame.Surface((max(1, self.size(txt)[0]), self.height), pygame.SRCALPHA)
+        for glyph, dest, area in self.blits(txt, (0, 0)):
+            surf.blit(glyph, dest, area, special_flags=pygame.BLEND_RGBA_MAX)
+        return surf
+
+glyph_atlases:OrderedDict = OrderedDict()
+glyph_atlases_max = 32
+
+# Shared atlas for (font, color, antialias), least recently used atlases are dropped past glyph_atlases_max.
+def glyph_atlas(f:font.Font, color, antialias:bool=True) -> GlyphAtlas:
+    key = (f, rgba(color), antialias)
+    with lock:
+        atlas = glyph_atlases.get(key)
+        if atlas is not None:
+            glyph_atlases.move_to_end(key)
+            return atlas
+    atlas = GlyphAtlas(f, color, antialias)
+    with lock:
+        atlas = glyph_atlases.setdefault(key, atlas)
+        if len(glyph_atlases) > glyph_atlases_max:
+            glyph_atlases.popitem(last=False)
+    return atlas
+
+
+# Named fonts are created on first access (fonts.txt_20 etc.) rather than at import time,
+# so importing this module doesn't init pygame.font or scan the system fonts.
+named_fonts = {
+    'txt_20': ('roboto', 20),
+    'txt_30': ('roboto', 30),
+    'txt_40': ('roboto', 40),
+    'txt_50': ('roboto', 50),
+    'txt_60': ('roboto', 60),
+    'head_60': ('impact', 60),
+    'head_80': ('impact', 80),
+    'head_100': ('impact', 100),
+    'head_120': ('impact', 120),
+}
+
+def __getattr__(name:str):
+    if name in named_fonts:
+        f = font_cache.get(*named_fonts[name])
+        globals()[name] = f
+        return f
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Pays the font startup cost up front: inits pygame.font, resolves font paths and builds the
+# named fonts, plus any extra (font_name, size) pairs. Call it whenever/wherever suits startup.
+def preload(extra:list=()):
+    if not font.get_init(): font.init()
+    font_cache.preload_paths({name for name, _ in named_fonts.values()} | {name for name, _ in extra})
+    for name in named_fonts:
+        __getattr__(name)
+    for font_name, size in extra:
+        font_cache.get(font_name, size)
+
+# Memoized results of fit_size(), keyed by (txt, width, height, font_name, ratio).
+fit_sizes:OrderedDict = OrderedDict()
+fit_sizes_max = 1024
+fit_reference_size = 100
+fit_slack = 2
+
+# Returns the largest point size at which txt fills up to ratio of a (width, height) box.
+# Text extents scale close to linearly with point size, so the size is scaled from one Font.size()
+# measurement at a shared reference size and no other size is created just to be measured. Hinting
+# rounds extents up by a pixel or so at small sizes, so the box is shrunk by fit_slack pixels first.
+def fit_size(txt:str, width:int, height:int, ratio:float=0.6, font_name:str='roboto') -> int:
+    key = (txt, width, height, font_name, ratio)
+    with lock:
+        size = fit_sizes.get(key)
+        if size is not None:
+            fit_sizes.move_to_end(key)
+            return size
+
+    max_w, max_h = max(1, width*ratio - fit_slack), max(1, height*ratio - fit_slack)
+    w, h = font_cache.get(font_name, fit_reference_size).size(txt)
+    scale = max_h/h if h else 1
+    if w: scale = min(scale, max_w/w)
+    size = max(1, int(fit_reference_size*scale))
+
+    with lock:
+        fit_sizes[key] = size
+        if len(fit_sizes) > fit_sizes_max:
+            fit_sizes.popitem(last=False)
+    return size
 
-txt_20 = font.SysFont('roboto', 20)
-txt_30 = font.SysFont('roboto', 30)
-txt_40 = font.SysFont('roboto', 40)
-txt_50 = font.SysFont('roboto', 50)
-txt_60 = font.SysFont('roboto', 60)
 def txt_size(size:int, font_name:str='roboto'):
-    return font.SysFont(font_name, int(size))
+    return font_cache.get(font_name, int(size))
 
-head_60 = font.SysFont('impact', 60, bold=False)
-head_80 = font.SysFont('impact', 80, bold=False)
-head_100 = font.SysFont('impact', 100, bold=False)
-head_120 = font.SysFont('impact', 120, bold=False)
 def head_size(size:int, font_name:str='impact', bold=False):
-    return font.SysFont(font_name, int(size), bold)
\ No newline at end of file
+    return font_cache.get(font_name, int(size), bold)
+
+
+class PrewarmJob():
+    # Progress of a prewarm() call, for a loading screen to poll or wait on.
+    def __init__(self, futures:list):
+        self.futures = futures
+        self.total = len(futures)
+
+    @property
+    def completed(self) -> int:
+        return sum(1 for future in self.futures if future.done())
+
+    @property
+    def progress(self) -> float:
+        return self.completed/self.total if self.total else 1.0
+
+    def done(self) -> bool:
+        return all(future.done() for future in self.futures)
+
+    # Blocks until every task finished or timeout seconds passed, returns whether it finished.
+    def wait(self, timeout:float=None) -> bool:
+        _, pending = wait(self.futures, timeout)
+        return not pending
+
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+
+    @property
+    def errors(self) -> list:
+        return [future.exception() for future in self.futures if future.done() and not future.cancelled() and future.exception() is not None]
+
+prewarm_workers = 2
+_executor:ThreadPoolExecutor = None
+
+# Runs each task on the shared prewarm thread pool and returns a PrewarmJob tracking them.
+def submit(tasks:list) -> PrewarmJob:
+    global _executor
+    if not font.get_init(): font.init()
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=prewarm_workers, thread_name_prefix='prewarm')
+    return PrewarmJob([_executor.submit(task) for task in tasks])
+
+# Resolves fonts and renders text into font_cache/text_cache on worker threads. entries are
+# (txt, font, size, color) with font a font name (or a Font, then size is ignored).
+# hud_components.prewarm() builds the entries for a tree of widgets.
+def prewarm(entries:list, antialias:bool=True) -> PrewarmJob:
+    def task(txt:str, f, size:int, color):
+        if not isinstance(f, font.Font): f = font_cache.get(f, size)
+        text_cache.render(f, txt, antialias, color)
+    return submit([lambda entry=entry: task(*entry) for entry in entries])
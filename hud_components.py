@@ -3,18 +3,391 @@ from pygame import Rect
 from pygame import Color, Surface, mouse, key
 from pygame.math import Vector2
 from pygame.event import Event
-from physics_objects import PhysicsObject
 import colors
 import fonts
 
+from collections import OrderedDict, deque
 import itertools
 import math
+import re
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class SurfacePool():
+    # Reusable surfaces keyed by (size, SRCALPHA or not). Surfaces are converted to the display's pixel
+    # format when a display mode is set, so blitting them to the screen needs no format conversion.
+    # Released surfaces wait in the pool for the next acquire() of the same size; past max_idle_bytes
+    # of waiting surfaces the oldest are dropped.
+    def __init__(self, max_idle_bytes:int=32*1024*1024):
+        self.max_idle_bytes = max_idle_bytes
+        self.idle_bytes = 0
+        self._idle:OrderedDict = OrderedDict() # id(surface) -> (key, surface), oldest first
+        self._by_key:dict = {} # key -> [id(surface)]
+        self.hits = 0
+        self.misses = 0
+        self.trimmed = 0
+
+    #- METHODS -#
+    # Returns a cleared surface (transparent, or black without SRCALPHA).
+    def acquire(self, size:tuple, flags:int=pygame.SRCALPHA) -> Surface:
+        size = (max(0, int(size[0])), max(0, int(size[1])))
+        key = (size, bool(flags & pygame.SRCALPHA))
+        ids = self._by_key.get(key)
+        if ids:
+            _, surface = self._idle.pop(ids.pop())
+            self.idle_bytes -= self._bytes(surface)
+            self.hits += 1
+            surface.fill((0,0,0,0))
+            return surface
+        self.misses += 1
+        surface = Surface(size, flags)
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            surface = surface.convert_alpha() if key[1] else surface.convert()
+        return surface
+
+    # Gives a surface back once nothing draws or blits it anymore.
+    def release(self, surface:Surface):
+        if surface is None or id(surface) in self._idle: return
+        key = (surface.get_size(), bool(surface.get_flags() & pygame.SRCALPHA))
+        self._idle[id(surface)] = (key, surface)
+        self._by_key.setdefault(key, []).append(id(surface))
+        self.idle_bytes += self._bytes(surface)
+        if self.idle_bytes > self.max_idle_bytes:
+            self.trim()
+
+    # Drops the oldest waiting surfaces until at most max_bytes (default max_idle_bytes) are left.
+    def trim(self, max_bytes:int=None):
+        max_bytes = self.max_idle_bytes if max_bytes is None else max_bytes
+        while self._idle and self.idle_bytes > max_bytes:
+            surface_id, (key, surface) = self._idle.popitem(last=False)
+            self._by_key[key].remove(surface_id)
+            if not self._by_key[key]: del self._by_key[key]
+            self.idle_bytes -= self._bytes(surface)
+            self.trimmed += 1
+
+    def clear(self):
+        self.trim(0)
+
+    def stats(self) -> dict:
+        acquires = self.hits + self.misses
+        return {
+            'idle': len(self._idle),
+            'idle_bytes': self.idle_bytes,
+            'max_idle_bytes': self.max_idle_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'trimmed': self.trimmed,
+            'reuse_rate': self.hits/acquires if acquires else 0.0,
+        }
+
+    def _bytes(self, surface:Surface) -> int:
+        return surface.get_pitch() * surface.get_height()
+
+surface_pool = SurfacePool()
+
+# Components create their surfaces through here, so allocations can be tracked in one place.
+def new_surface(size:tuple, flags:int=pygame.SRCALPHA) -> Surface:
+    return surface_pool.acquire(size, flags)
+
+# Components give replaced surfaces back through here.
+def release_surface(surface:Surface):
+    surface_pool.release(surface)
+
+
+# Button/TextBox properties (txt, pos, width, height and colors) can be bound to a callable or an
+# Observable instead of a value. A bound callable is called at most once per frame tick of its
+# widget: a Hud stamps the components it updates and draws with a new tick every frame, and
+# next_frame(tree) does the same for widgets drawn without a Hud. The first access in a tick caches
+# the result. A widget that isn't stamped (never added to a Hud, or removed from it) calls its
+# callables on every access, as before.
+frame = 0
+
+def next_frame(tree=None) -> int:
+    global frame
+    frame += 1
+    if tree is not None:
+        for widget in iter_widgets(tree): widget._tick = frame
+    return frame
+
+class Observable():
+    # A value that calls its subscribers when it changes. Widgets don't subscribe: they read a bound
+    # Observable's value directly without caching, so a change shows up on the widget's next refresh.
+    def __init__(self, value=None):
+        self._value = value
+        self._subscribers:list = []
+
+    @property
+    def value(self):
+        return self._value
+    @value.setter
+    def value(self, value):
+        if value == self._value: return
+        self._value = value
+        for callback in list(self._subscribers):
+            callback(value)
+
+    def __call__(self):
+        return self._value
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers: self._subscribers.remove(callback)
+
+# Value of owner's binding attribute name (ex. '_width'), see next_frame().
+def bound_value(owner, name:str):
+    value = getattr(owner, name)
+    if isinstance(value, Observable): return value._value
+    if not callable(value): return value
+    tick = owner._tick
+    if tick == 0: return value()
+    cached = owner._bound.get(name)
+    if cached is not None and cached[0] == tick: return cached[1]
+    result = value()
+    owner._bound[name] = (tick, result)
+    return result
+
+
+# Index of the mip level (level k is 2**-k of the world size) to scale a view at zoom from: the
+# smallest level that is still at least as detailed as the zoom needs.
+def mip_level(zoom:float, max_level:int) -> int:
+    if zoom >= 1: return 0
+    return max(0, min(max_level, int(math.floor(math.log2(1/zoom) + 1e-9))))
+
+# Scales source (a surface or subsurface) to size, reusing dest when it already has that size.
+def scale_to(source:Surface, size:tuple, dest:Surface=None) -> Surface:
+    size = (max(1, int(size[0])), max(1, int(size[1])))
+    if dest is not None and dest.get_size() != size: dest = None
+    if source.get_bitsize() < 24:
+        return pygame.transform.scale(source, size, dest) if dest is not None else pygame.transform.scale(source, size)
+    return pygame.transform.smoothscale(source, size, dest) if dest is not None else pygame.transform.smoothscale(source, size)
+
+# World region (x, y, w, h) shown by a view of the window's size at zoom, around the view's center.
+def zoomed_view(view:Rect, zoom:float) -> tuple:
+    w, h = view.w/zoom, view.h/zoom
+    return (view.centerx - w/2, view.centery - h/2, w, h)
+
+# Copies piece into surface at rect, replacing the pixels there (alpha included) instead of blending.
+def replace_rect(surface:Surface, piece:Surface, rect:Rect):
+    surface.fill((0,0,0,0), rect)
+    surface.blit(piece, rect, special_flags=pygame.BLEND_RGBA_MAX)
+
+# Halves source (cropped to an even size) into a new surface.
+def halve(source:Surface) -> Surface:
+    w, h = max(1, source.get_width()//2), max(1, source.get_height()//2)
+    return scale_to(source.subsurface((0, 0, min(source.get_width(), 2*w), min(source.get_height(), 2*h))), (w, h))
+
+
+class MipChain():
+    # Pre-scaled copies of a surface, each level half the size of the one before (level 0 is the
+    # surface itself). Levels are built the first time they're asked for. After mark_dirty(rect) only
+    # the region of each built level that rect covers is scaled again, the next time a level is read.
+    def __init__(self, surface:Surface, max_level:int=6):
+        self.surface = surface
+        self.max_level = max_level
+        self.version = 0
+        self._levels:list = [surface]
+        self._dirty:list = [] # rects in level 0 coordinates waiting to be re-scaled
+
+    #- METHODS -#
+    def level(self, k:int) -> Surface:
+        k = min(k, self.max_level)
+        self._flush()
+        while len(self._levels) <= k:
+            previous = self._levels[-1]
+            if previous.get_width() < 2 or previous.get_height() < 2: break
+            self._levels.append(halve(previous))
+        return self._levels[min(k, len(self._levels)-1)]
+
+    def mark_dirty(self, rect:Rect=None):
+        self.version += 1
+        if rect is None:
+            self._levels = [self.surface]
+            self._dirty.clear()
+        else:
+            self._dirty.append(Rect(rect))
+
+    def _flush(self):
+        for rect in self._dirty:
+            for k in range(1, len(self._levels)):
+                # rect grown to whole pixels of level k, scaled from the matching 2x region of level k-1
+                a = 2**k
+                left, top = rect.left//a, rect.top//a
+                r = Rect(left, top, -(-rect.right//a) - left, -(-rect.bottom//a) - top).clip(self._levels[k].get_rect())
+                source = Rect(2*r.x, 2*r.y, 2*r.w, 2*r.h).clip(self._levels[k-1].get_rect())
+                if r.w <= 0 or r.h <= 0 or source.w <= 0 or source.h <= 0: continue
+                replace_rect(self._levels[k], scale_to(self._levels[k-1].subsurface(source), r.size), r)
+        self._dirty.clear()
+
+    @property
+    def allocated(self) -> int:
+        return len(self._levels) - 1
+
+
+class TiledWorld():
+    # A world surface split into square chunks, for worlds too big to keep in one Surface.
+    # Chunks are allocated lazily and drawn by render(chunk_surface, chunk_rect) the first time they
+    # come into view (chunk_rect is in world coordinates), redrawn after mark_dirty(), and released
+    # once they are more than keep_margin pixels outside the view.
+    # Zoomed out draws keep only the mip level they use: a chunk missing at that level is rendered
+    # into a temporary full size surface, halved down and the full size surface handed back to the pool.
+    def __init__(self, width:int, height:int, render, chunk_size:int=512, flags:int=0, keep_margin:int=None):
+        self.width = width
+        self.height = height
+        self.render = render
+        self.chunk_size = chunk_size
+        self.flags = flags
+        self.keep_margin = chunk_size if keep_margin is None else keep_margin
+        self._chunks:dict = {} # (column, row) -> Surface
+        self._dirty:set = set()
+        self._levels:dict = {0: self._chunks} # mip level -> {(column, row) -> Surface at 2**-level of the chunk's size}
+        self.version = 0
+        self._zoomed:tuple = None # (key, scratch surface, scaled surface) of the last zoomed draw
+
+    #- METHODS -#
+    def get_rect(self) -> Rect:
+        return Rect(0, 0, self.width, self.height)
+
+    def chunk_rect(self, key:tuple) -> Rect:
+        return Rect(key[0]*self.chunk_size, key[1]*self.chunk_size, self.chunk_size, self.chunk_size).clip(self.get_rect())
+
+    def chunks_in(self, rect:Rect) -> list:
+        rect = Rect(rect).clip(self.get_rect())
+        if rect.w <= 0 or rect.h <= 0: return []
+        cs = self.chunk_size
+        return [(column, row) for row in range(rect.top//cs, (rect.bottom-1)//cs + 1)
+                              for column in range(rect.left//cs, (rect.right-1)//cs + 1)]
+
+    # Marks the chunks overlapping rect (the whole world if None) to be redrawn when next in view.
+    # Their smaller mip levels are dropped and halved again from the redrawn chunk when needed.
+    def mark_dirty(self, rect:Rect=None):
+        keys = None if rect is None else set(self.chunks_in(rect))
+        if keys is None:
+            self._dirty.update(self._chunks)
+        else:
+            self._dirty.update(key for key in keys if key in self._chunks)
+        for k, level in self._levels.items():
+            if k == 0: continue
+            for key in [key for key in level if keys is None or key in keys]:
+                del level[key]
+
+    def get_chunk(self, key:tuple) -> Surface:
+        chunk = self._chunks.get(key)
+        if chunk is None or key in self._dirty:
+            rect = self.chunk_rect(key)
+            if chunk is None:
+                chunk = new_surface(rect.size, self.flags)
+                self._chunks[key] = chunk
+            else:
+                chunk.fill((0,0,0,0))
+            self.render(chunk, rect)
+            self._dirty.discard(key)
+            self.version += 1
+        return chunk
+
+    # Chunk at mip level k (2**-k of its size). Halved from the full size chunk if that is allocated,
+    # otherwise from a temporary one, so only level k is kept.
+    def get_chunk_level(self, key:tuple, k:int) -> Surface:
+        if k == 0: return self.get_chunk(key)
+        level = self._levels.setdefault(k, {})
+        surf = level.get(key)
+        if surf is None:
+            if key in self._chunks:
+                chunk = self.get_chunk(key)
+            else:
+                rect = self.chunk_rect(key)
+                chunk = new_surface(rect.size, self.flags)
+                self.render(chunk, rect)
+            surf = chunk
+            for _ in range(k):
+                surf = halve(surf)
+            if key not in self._chunks: release_surface(chunk)
+            level[key] = surf
+            self.version += 1
+        return surf
+
+    # Frees level k surfaces of chunks further than keep_margin outside of view (all of them if view is None).
+    # Full size chunks go back to the pool, smaller levels are dropped since no chunk reuses their size.
+    def release_level(self, k:int, view:Rect=None):
+        level = self._levels.get(k, {})
+        keep = set() if view is None else set(self.chunks_in(Rect(view).inflate(2*self.keep_margin, 2*self.keep_margin)))
+        for key in [key for key in level if key not in keep]:
+            surf = level.pop(key)
+            if k == 0:
+                release_surface(surf)
+                self._dirty.discard(key)
+
+    # Frees chunks that are further than keep_margin outside of view, and every level except the one in use.
+    def release(self, view:Rect, k:int=0):
+        for level in list(self._levels):
+            self.release_level(level, view if level == k else None)
+
+    # Blits the part of the world inside view to window at dest, one blit per visible chunk.
+    # With a zoom, view is the window area and the world region around its center is scaled into it.
+    def draw(self, window:Surface, dest:tuple, view:Rect, zoom:float=1.0):
+        if zoom != 1:
+            self.draw_zoomed(window, dest, view, zoom)
+            return
+        blits = []
+        for key in self.chunks_in(view):
+            rect = self.chunk_rect(key)
+            visible = rect.clip(view)
+            blits.append((self.get_chunk(key), (dest[0] + visible.x - view.x, dest[1] + visible.y - view.y), visible.move(-rect.x, -rect.y)))
+        window.blits(blits, False)
+        self.release(view)
+
+    # Assembles the visible world region from the chunks' mip level nearest above zoom, then scales
+    # only that region to the window. The scaled result is reused while the view and chunks don't change.
+    def draw_zoomed(self, window:Surface, dest:tuple, view:Rect, zoom:float):
+        world = zoomed_view(view, zoom)
+        k = mip_level(zoom, int(math.log2(self.chunk_size)))
+        s = 2**-k
+        region = Rect(math.floor(world[0]*s), math.floor(world[1]*s), math.ceil(world[2]*s)+1, math.ceil(world[3]*s)+1)
+        visible = Rect(int(world[0]), int(world[1]), math.ceil(world[2])+1, math.ceil(world[3])+1)
+        blits = [(self.get_chunk_level(key, k), (int(self.chunk_rect(key).x*s) - region.x, int(self.chunk_rect(key).y*s) - region.y))
+                 for key in self.chunks_in(visible)]
+        key = (tuple(region), k, tuple(view.size), zoom, self.version)
+        if self._zoomed is None or self._zoomed[0] != key:
+            scratch = self._zoomed[1] if self._zoomed is not None else None
+            if scratch is not None and scratch.get_size() != region.size:
+                release_surface(scratch)
+                scratch = None
+            if scratch is None: scratch = new_surface(region.size, self.flags)
+            scratch.fill((0,0,0,0))
+            scratch.blits(blits, False)
+            f = zoom/s
+            scaled = scale_to(scratch, (region.w*f, region.h*f), self._zoomed[2] if self._zoomed is not None else None)
+            self._zoomed = (key, scratch, scaled)
+        f = zoom/s
+        offset = ((region.x - world[0]*s)*f, (region.y - world[1]*s)*f)
+        window.blit(self._zoomed[2], dest, Rect(-offset[0], -offset[1], view.w, view.h))
+        self.release(visible, k)
+
+    @property
+    def allocated(self) -> int:
+        return len(self._chunks)
+
+    # Bytes held by the chunks of every mip level.
+    @property
+    def resident_bytes(self) -> int:
+        return sum(surf.get_bytesize()*surf.get_width()*surf.get_height() for level in self._levels.values() for surf in level.values())
 
 
 class Camera(Rect):
-    def __init__(self, left:float, top:float, width:float, height:float, surface:Surface):
+    def __init__(self, left:float, top:float, width:float, height:float, surface:Surface|TiledWorld, zoom:float=1.0):
         super().__init__(left, top, width, height)
-        self.surface:Surface = surface
+        self.surface:Surface|TiledWorld = surface
+        # >1 zooms in, <1 zooms out around the center. Zoomed views are scaled from mip levels of the world.
+        self.zoom = zoom
+        self.mips:MipChain = None
+        self._zoomed:tuple = None # (key, scaled surface) of the last zoomed draw
 
     @property
     def pos(self) -> Vector2:
@@ -35,7 +408,39 @@ class Camera(Rect):
     def draw(self, window:Surface):
         x = (window.get_width()-self.width)*0.5
         y = (window.get_height()-self.height)*0.5
-        window.blit(self.surface, (x,y), self)
+        if isinstance(self.surface, TiledWorld):
+            self.surface.draw(window, (x,y), self.view(), self.zoom)
+        elif self.zoom != 1:
+            self.draw_zoomed(window, (x,y))
+        else:
+            window.blit(self.surface, (x,y), self)
+
+    # Scales only the visible region, from the mip level nearest above the zoom. The scaled view is
+    # reused while the camera, zoom and world don't change.
+    def draw_zoomed(self, window:Surface, dest:tuple):
+        if self.mips is None or self.mips.surface is not self.surface:
+            self.mips = MipChain(self.surface)
+        world = zoomed_view(self, self.zoom)
+        k = mip_level(self.zoom, self.mips.max_level)
+        level = self.mips.level(k)
+        k = min(k, self.mips.allocated) # small worlds run out of levels
+        s = 2**-k
+        region = Rect(math.floor(world[0]*s), math.floor(world[1]*s), math.ceil(world[2]*s)+1, math.ceil(world[3]*s)+1).clip(level.get_rect())
+        if region.w <= 0 or region.h <= 0: return
+        f = self.zoom/s
+        key = (tuple(region), id(level), self.zoom, self.mips.version)
+        if self._zoomed is None or self._zoomed[0] != key:
+            scaled = scale_to(level.subsurface(region), (region.w*f, region.h*f), self._zoomed[1] if self._zoomed is not None else None)
+            self._zoomed = (key, scaled)
+        # where the region's top left lands relative to the view's top left
+        dx, dy = (region.x - world[0]*s)*f, (region.y - world[1]*s)*f
+        area = Rect(max(0, -dx), max(0, -dy), self.w - max(0, dx), self.h - max(0, dy))
+        window.blit(self._zoomed[1], (dest[0] + max(0, dx), dest[1] + max(0, dy)), area)
+
+    # Call after drawing on the world surface, so the zoomed levels covering rect are re-scaled.
+    def mark_dirty(self, rect:Rect=None):
+        if isinstance(self.surface, TiledWorld): self.surface.mark_dirty(rect)
+        elif self.mips is not None: self.mips.mark_dirty(rect)
 
 
 
@@ -69,6 +474,12 @@ class Bar():
         self.border_color = border_color
         self.border_width = border_width
         self.fill_color = fill_color        
+        self._frame:Surface = None
+        self._frame_key:tuple = None
+        self._fill:Surface = None
+        self._fill_key:tuple = None
+        self._fill_geometry_key:tuple = None
+        self._version = 0
         
         self.set_fill_direction(fill_direction)
         self.set_split(split)
@@ -92,7 +503,8 @@ class Bar():
 
     @property
     def fill_rect(self):
-        return self._fill_rect()
+        pos, size, _ = self._fill_geometry()
+        return (Vector2(pos), Vector2(size))
     @property
     def fullness(self):
         n = self.curr_value/self.max_value
@@ -106,22 +518,47 @@ class Bar():
         else:
             self.curr_value = value
 
+    def update(self, dt=0):
+        pass
+
     def draw(self, window):
-        edge=Vector2(2,2)
-        # draw border
-        frame = pygame.Surface(self.size+2*edge, pygame.SRCALPHA)
-        pygame.draw.rect(frame, self.border_color, frame.get_rect(), self.border_width)
-
-        # frame.fill(self.border_color)
-        # pygame.draw.rect(frame, self.border_color, (self.pos-edge, self.size+2*edge), self.border_width)
-        # draw fill
-        fill = pygame.Surface(self.fill_rect[1], pygame.SRCALPHA)
-        pygame.draw.rect(fill, self.fill_color, fill.get_rect())
-
-        # fill.fill(self.fill_color)
-        # pygame.draw.rect(frame, self.fill_color, self.fill_rect)
-        window.blit(frame, self.pos-edge)
-        window.blit(fill, self.fill_rect[0])
+        self.refresh()
+        window.blit(self._frame, self._frame_pos)
+        window.blit(self._fill, self._fill_pos, self._fill_area)
+
+    def get_blits(self) -> list:
+        return [(self._frame, self._frame_pos), (self._fill, self._fill_pos, self._fill_area)]
+
+    # Rebuilds the cached border and fill surfaces only when their size or colors change. The fill
+    # surface covers the whole bar and is blitted through an area rect sized to the current fill.
+    def refresh(self):
+        edge = 2
+        frame_key = (self.size.x, self.size.y, tuple(self.border_color), self.border_width)
+        if frame_key != self._frame_key:
+            self._frame_key = frame_key
+            release_surface(self._frame)
+            self._frame = new_surface(self.size+Vector2(2*edge))
+            pygame.draw.rect(self._frame, self.border_color, self._frame.get_rect(), self.border_width)
+            self._version += 1
+        fill_key = (self.size.x, self.size.y, tuple(self.fill_color))
+        if fill_key != self._fill_key:
+            self._fill_key = fill_key
+            release_surface(self._fill)
+            self._fill = new_surface(self.size)
+            self._fill.fill(self.fill_color)
+            self._version += 1
+        self._frame_pos = (self.pos.x-edge, self.pos.y-edge)
+        self._fill_pos, _, self._fill_area = self._fill_geometry()
+
+    # Fill rect, recomputed only when the value, max, geometry, direction or split changed.
+    def _fill_geometry(self) -> tuple:
+        key = (self.curr_value, self.max_value, self.pos.x, self.pos.y, self.size.x, self.size.y,
+               self.anchor_pos.x, self.anchor_pos.y, self._fill_direction.x, self._fill_direction.y, self._split)
+        if key != self._fill_geometry_key:
+            self._fill_geometry_key = key
+            pos, size = self._fill_rect()
+            self._fill_geometry_value = (pos, size, Rect(0, 0, size.x, size.y))
+        return self._fill_geometry_value
     
     def rel_to_abs(self, vector):
         return vector.elementwise() * self.size.elementwise()
@@ -148,8 +585,259 @@ class Bar():
         pass
 
 
+class BarBatch():
+    # Many bars stored as numpy arrays instead of one Bar object each. Fill rects are computed for
+    # every bar in one vectorized pass (same math as Bar.fill_rect_default/fill_rect_split) and
+    # everything is drawn with a single Surface.blits() call. Border and fill surfaces are shared
+    # between bars with the same size and colors.
+    # The arrays can be written directly, ex. batch.value[i] = hp or a Tweener targeting batch.value.
+    # They are allocated once for capacity bars and never replaced, so references to them stay valid;
+    # add() raises once the batch is full. The default capacity is about 1MB of arrays.
+    def __init__(self, capacity:int=8192):
+        if np is None:
+            raise ImportError("BarBatch requires numpy.")
+        self.count = 0 # slots in use, including removed ones waiting to be reused
+        self.active = np.zeros(capacity, dtype=bool)
+        self.pos = np.zeros((capacity, 2))
+        self.size = np.zeros((capacity, 2))
+        self.max_value = np.ones(capacity)
+        self.value = np.zeros(capacity)
+        self.anchor_pos = np.zeros((capacity, 2))
+        self.fill_direction = np.zeros((capacity, 2))
+        self.split = np.zeros(capacity, dtype=bool)
+        self.border_width = np.ones(capacity, dtype=np.int32)
+        self.border_color = np.zeros((capacity, 4), dtype=np.uint8)
+        self.fill_color = np.zeros((capacity, 4), dtype=np.uint8)
+        self._free:list = []
+        self._surfaces:dict = {} # ('frame'|'fill', size and colors) -> shared Surface
+        self._style_key:tuple = None
+        self._pos_key:tuple = None
+        self._frames:list = []
+        self._frame_blits:list = []
+        self._fills:list = []
+        self._order = None
+        self._value_key:tuple = None
+        self._version = 0
+
+    #- METHODS -#
+    def add(self, pos:tuple, size:tuple, max_value:float=1.0, start_value:float=0, anchor_pos:str='left', fill_direction:str='horizontal',
+            split:bool=False, border_color:tuple=(255,255,255), border_width:int=1, fill_color:tuple=(255,255,255)) -> int:
+        if self._free:
+            i = self._free.pop()
+        elif self.count < len(self.active):
+            i = self.count
+            self.count += 1
+        else:
+            raise ValueError(f"Error: BarBatch is full. Capacity: {len(self.active)}.")
+        self.active[i] = True
+        self.pos[i] = pos
+        self.size[i] = size
+        self.max_value[i] = max_value
+        self.value[i] = start_value
+        self.anchor_pos[i] = Bar.bar_anchors[anchor_pos]
+        self.fill_direction[i] = Bar.fill_directions[fill_direction]
+        self.split[i] = split
+        self.border_width[i] = border_width
+        self.border_color[i] = Color(border_color)
+        self.fill_color[i] = Color(fill_color)
+        return i
+
+    def remove(self, i:int):
+        if self.active[i]:
+            self.active[i] = False
+            self._free.append(i)
+
+    # Same clamping as Bar.set_curr_value, for one index or an array of them.
+    def set_values(self, values, indices=None):
+        if indices is None: indices = slice(0, self.count)
+        max_value = self.max_value[indices]
+        self.value[indices] = np.clip(values, -max_value, max_value)
+
+    def fullness(self) -> np.ndarray:
+        n = self.count
+        return np.clip(self.value[:n]/self.max_value[:n], -1, 1)
+
+    # Returns (pos, size) arrays of shape (count, 2) with the fill rect of every slot.
+    def fill_rects(self) -> tuple:
+        n = self.count
+        pos, size = self.pos[:n], self.size[:n]
+        anchor, direction = self.anchor_pos[:n], self.fill_direction[:n]
+        f = self.fullness()[:, np.newaxis]
+
+        # the operations are done in the same order as Bar's Vector2 math, so the float results (and
+        # the pixels they truncate to) are exactly the same
+        ad = anchor*direction
+        fill_pos = pos + (ad + (-ad)*f)*size
+        fill_size = size + ((-direction)*(1-f))*size
+
+        split = self.split[:n]
+        if split.any():
+            vertical = (direction[:, 0] == 0) & (direction[:, 1] == 1)
+            fs = (f[:, 0]*np.where(vertical, -0.5, 0.5))[:, np.newaxis]
+            half = 0.5*direction
+            offset = np.where(fs < 0, (half*fs)*2, 0.0)
+            fill_pos[split] = (pos + (half + offset)*size)[split]
+            fill_size[split] = (size + ((-direction)*(1-np.abs(fs)))*size)[split]
+        return (fill_pos, fill_size)
+
+    def update(self, dt=0):
+        pass
+
+    def draw(self, window:Surface):
+        window.blits(self.get_blits(), False)
+
+    # Frame and fill of each bar in slot order, so overlapping bars stack like separate Bar.draw() calls.
+    def get_blits(self) -> list:
+        self.refresh()
+        order = self._order
+        fill_pos, fill_size = self.fill_rects()
+        areas = [Rect(0, 0, w, h) for w, h in fill_size[order].astype(np.int64).tolist()]
+        blits = [None]*(2*len(order))
+        blits[0::2] = self._frame_blits
+        blits[1::2] = zip(self._fills, fill_pos[order].tolist(), areas)
+        return blits
+
+    # Looks up the shared surfaces again only when a size, color, border or the set of bars changed,
+    # and the frame blits only when a bar moved. _version changes whenever any bar would look different.
+    def refresh(self):
+        n = self.count
+        style_key = (self.active[:n].tobytes(), self.size[:n].tobytes(), self.border_color[:n].tobytes(),
+                     self.border_width[:n].tobytes(), self.fill_color[:n].tobytes())
+        pos_key = (style_key, self.pos[:n].tobytes())
+        value_key = (pos_key, self.value[:n].tobytes(), self.max_value[:n].tobytes(), self.anchor_pos[:n].tobytes(),
+                     self.fill_direction[:n].tobytes(), self.split[:n].tobytes())
+        if value_key != self._value_key:
+            self._value_key = value_key
+            self._version += 1
+        if style_key != self._style_key:
+            self._style_key = style_key
+            self._rebuild()
+        if pos_key != self._pos_key:
+            edge = 2
+            self._pos_key = pos_key
+            self._frame_blits = list(zip(self._frames, (self.pos[self._order] - edge).tolist()))
+
+    def _rebuild(self):
+        self._order = np.flatnonzero(self.active[:self.count])
+        sizes = self.size[self._order].tolist()
+        self._frames = [self._surface('frame', tuple(size), tuple(self.border_color[i]), int(self.border_width[i]))
+                        for i, size in zip(self._order, sizes)]
+        self._fills = [self._surface('fill', tuple(size), tuple(self.fill_color[i]))
+                       for i, size in zip(self._order, sizes)]
+        # drop shared surfaces no bar uses anymore
+        used = {id(s) for s in self._frames} | {id(s) for s in self._fills}
+        for k in [k for k, s in self._surfaces.items() if id(s) not in used]:
+            release_surface(self._surfaces.pop(k))
+
+    def _surface(self, kind:str, size:tuple, color:tuple, border_width:int=0) -> Surface:
+        key = (kind, size, color, border_width)
+        surf = self._surfaces.get(key)
+        if surf is None:
+            edge = 2
+            if kind == 'frame':
+                surf = new_surface(Vector2(size)+Vector2(2*edge))
+                pygame.draw.rect(surf, color, surf.get_rect(), border_width)
+            else:
+                surf = new_surface(size)
+                surf.fill(color)
+            self._surfaces[key] = surf
+        return surf
+
+
+class NineSlice():
+    # Skin image split once into 3x3 pieces by margins (left, top, right, bottom): corners keep their
+    # size, edges stretch along one axis and the center along both. The composed skin is cached per
+    # target size (least recently used sizes dropped past max_sizes), so every widget using the same
+    # NineSlice at the same size shares one surface and a redraw is a single blit.
+    # The cached surfaces are shared, blit them but don't draw on them. Call clear() after changing skin,
+    # its pixels, colorkey or alpha.
+    def __init__(self, skin:Surface, margins:int|tuple, smooth:bool=False, max_sizes:int=64):
+        self.skin = skin
+        self.margins = (margins,)*4 if isinstance(margins, int) else tuple(margins)
+        self.smooth = smooth
+        self.max_sizes = max_sizes
+        self._pieces:list = None
+        self._sizes:OrderedDict = OrderedDict() # (width, height) -> composed Surface
+        self.hits = 0
+        self.misses = 0
+        self._split()
+
+    #- METHODS -#
+    def render(self, size:tuple) -> Surface:
+        size = (int(size[0]), int(size[1]))
+        surf = self._sizes.get(size)
+        if surf is not None:
+            self.hits += 1
+            self._sizes.move_to_end(size)
+            return surf
+        self.misses += 1
+        surf = self._sizes[size] = self._compose(size)
+        while len(self._sizes) > self.max_sizes:
+            release_surface(self._sizes.popitem(last=False)[1])
+        return surf
+
+    def draw(self, target:Surface, rect:Rect):
+        rect = Rect(rect)
+        target.blit(self.render(rect.size), rect)
+
+    def clear(self):
+        while self._sizes:
+            release_surface(self._sizes.popitem()[1])
+        self._split()
+
+    # Splits a per-pixel alpha copy of the skin, so a colorkey or the skin's surface alpha end up in
+    # the pieces' alpha (BLEND_RGBA_MAX in _compose() ignores both).
+    def _split(self):
+        skin = self.skin
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            copy = skin.convert_alpha()
+            copy.set_alpha(255)
+        else:
+            copy = Surface(skin.get_size(), pygame.SRCALPHA)
+            source = skin.copy()
+            source.set_alpha(255)
+            copy.blit(source, (0, 0))
+        alpha = skin.get_alpha()
+        if alpha is not None and alpha < 255:
+            copy.fill((255, 255, 255, alpha), special_flags=pygame.BLEND_RGBA_MULT)
+        left, top, right, bottom = self.margins
+        w, h = copy.get_size()
+        columns = [(0, left), (left, w - left - right), (w - right, right)]
+        rows = [(0, top), (top, h - top - bottom), (h - bottom, bottom)]
+        self._pieces = [[copy.subsurface((x, y, cw, rh)) for x, cw in columns] for y, rh in rows]
+
+    def _compose(self, size:tuple) -> Surface:
+        w, h = size
+        left, top, right, bottom = self.margins
+        # margins shrink proportionally when the target is smaller than the skin's border
+        sx = min(1, w/(left + right)) if left + right else 1
+        sy = min(1, h/(top + bottom)) if top + bottom else 1
+        left, right, top, bottom = int(left*sx), int(right*sx), int(top*sy), int(bottom*sy)
+        columns = [(0, left), (left, w - left - right), (w - right, right)]
+        rows = [(0, top), (top, h - top - bottom), (h - bottom, bottom)]
+        surf = new_surface(size)
+        scale = scale_to if self.smooth else pygame.transform.scale
+        blits = []
+        for (y, rh), pieces in zip(rows, self._pieces):
+            for (x, cw), piece in zip(columns, pieces):
+                if cw <= 0 or rh <= 0 or piece.get_width() == 0 or piece.get_height() == 0: continue
+                if piece.get_size() != (cw, rh):
+                    piece = scale(piece, (cw, rh))
+                blits.append((piece, (x, y)))
+        # the pieces don't overlap, BLEND_RGBA_MAX onto the clear surface copies them as they are
+        for piece, pos in blits:
+            surf.blit(piece, pos, special_flags=pygame.BLEND_RGBA_MAX)
+        return surf
+
+    def stats(self) -> dict:
+        return {'sizes': len(self._sizes), 'hits': self.hits, 'misses': self.misses}
+
+
 class Button():
-    def __init__(self, txt:str, pos:Vector2, width:int, height:int, txt_color:Color|tuple, fill_color:Color|tuple, out_color:Color|tuple, on_click:lambda:(), on_hover:lambda:(), auto_txt_resize=True):
+    def __init__(self, txt:str, pos:Vector2, width:int, height:int, txt_color:Color|tuple, fill_color:Color|tuple, out_color:Color|tuple, on_click:lambda:(), on_hover:lambda:(), auto_txt_resize=True,
+                 glyph_atlas=False, skin:NineSlice=None, hover_skin:NineSlice=None, pressed_skin:NineSlice=None):
+        self._bound:dict = {} # binding name -> (frame, value), see next_frame()
+        self._tick = 0 # frame tick stamped by the Hud drawing this widget, 0 outside of one
         self.txt = txt
         self.pos = pos # anchored to top left of rect
         
@@ -161,6 +849,12 @@ class Button():
         self.on_click = on_click
         self.on_hover = on_hover
         self.auto_txt_resize = auto_txt_resize
+        # draw the text from a shared glyph atlas, for labels that change every frame
+        self.glyph_atlas = glyph_atlas
+        # nine-slice skins drawn instead of the fill and outline, hover/pressed fall back to skin
+        self.skin = skin
+        self.hover_skin = hover_skin
+        self.pressed_skin = pressed_skin
 
         self.txt_size = self.height/2
         self.txt_size_ratio = 0.6
@@ -168,9 +862,15 @@ class Button():
         self.out_width = 3
         self.hovering = False
         self.pressed = False
+        self.input_router:InputRouter = None
+        self._surface:Surface = None
+        self._state:tuple = None
+        self._version = 0
 
     #- METHODS -#
     def update(self, dt):
+        # hover and press state come from the InputRouter's events instead of polling the mouse
+        if self.input_router is not None: return
         # print(f"Called update() on {self.txt} btn")
         # print(f"\tpos: {self.pos}, width: {self.width}, height: {self.height}, mouse_in_rect: {self.is_within_rect(mouse.get_pos())}, mpos: {mouse.get_pos()}")
         # TODO: add event poll to call on_click() and on_hover()
@@ -187,96 +887,149 @@ class Button():
             self.pressed = False
         # pass
 
+    def click(self):
+        if callable(self._on_click): self._on_click()
+
+    def hover(self):
+        if callable(self._on_hover): self._on_hover()
+
     def draw(self, surface:Surface):
+        self.refresh()
+        # blit button to surface
+        surface.blit(self._surface, self.pos)
+
+    def get_blits(self) -> list:
+        return [(self._surface, self.pos)]
+
+    # Rebuilds the button surface only if something it is drawn from changed since the last refresh.
+    def refresh(self) -> bool:
+        state = self._snapshot()
+        if state == self._state: return False
+        self._compose(*state[:6])
+        # composing can swap the font (auto resize), store the one the surface was drawn with
+        self._state = state[:-1] + (self.font,)
+        self._version += 1
+        return True
+
+    def invalidate(self):
+        self._state = None
+
+    # True if the next refresh() would rebuild the surface.
+    def is_stale(self) -> bool:
+        return self._snapshot() != self._state
+
+    def _snapshot(self) -> tuple:
+        return (self.txt, self.width, self.height, tuple(self.fill_color), tuple(self.out_color), tuple(self.txt_color),
+                self.hovering, self.pressed, self.out_width, self.auto_txt_resize, self.glyph_atlas, self.txt_size_ratio,
+                self.skin, self.hover_skin, self.pressed_skin, self.font)
+
+    def _compose(self, txt_str:str, width:int, height:int, fill_color:tuple, out_color:tuple, txt_color:tuple):
+        release_surface(self._surface)
         # create button surface
-        fill_color = self.fill_color if not self.hovering else colors.contrast_dark_light(self.fill_color)
-        out_color = self.out_color if not self.hovering else colors.contrast_dark_light(self.out_color)
-        txt_color = self.txt_color if not self.hovering else colors.contrast_dark_light(self.txt_color)
+        if self.hovering:
+            fill_color = colors.derived(colors.contrast_dark_light, fill_color)
+            out_color = colors.derived(colors.contrast_dark_light, out_color)
+            txt_color = colors.derived(colors.contrast_dark_light, txt_color)
         if self.pressed:
-            fill_color = colors.dark(fill_color)
-            out_color = colors.step_to(out_color, fill_color, True)
-            txt_color = colors.step_to(txt_color, fill_color, True)
+            fill_color = colors.derived(colors.dark, fill_color)
+            out_color = colors.derived(colors.step_to, out_color, fill_color, True)
+            txt_color = colors.derived(colors.step_to, txt_color, fill_color, True)
 
-        button = Surface((self.width, self.height), pygame.SRCALPHA)
-        button.fill(fill_color)
+        button = new_surface((width, height))
+        skin = self.skin
+        if self.hovering and self.hover_skin is not None: skin = self.hover_skin
+        if self.pressed and self.pressed_skin is not None: skin = self.pressed_skin
+        if skin is not None:
+            button.blit(skin.render((width, height)), (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            button.fill(fill_color)
 
-        # add button outline
-        pygame.draw.rect(button, out_color, (0,0, button.get_width(), button.get_height()), self.out_width)
+            # add button outline
+            pygame.draw.rect(button, out_color, (0,0, button.get_width(), button.get_height()), self.out_width)
 
         # add button text
-        txt = self.font.render(self.txt, True, txt_color)
-        if self.auto_txt_resize: 
-            c=self.txt_size
-            n = self.resize_txt(txt.get_width(), txt.get_height())
-            if c != n: txt = self.font.render(self.txt, True, txt_color)
-        button.blit(txt, ((button.get_width()-txt.get_width())/2, (button.get_height()-txt.get_height())/2))
-
-        # blit button to surface
-        surface.blit(button, self.pos)
+        if self.auto_txt_resize: self.resize_txt(txt_str, width, height)
+        if self.glyph_atlas:
+            atlas = fonts.glyph_atlas(self.font, txt_color)
+            w, h = atlas.size(txt_str)
+            atlas.blit_text(button, txt_str, ((button.get_width()-w)/2, (button.get_height()-h)/2))
+        else:
+            txt = fonts.render(self.font, txt_str, True, txt_color)
+            button.blit(txt, ((button.get_width()-txt.get_width())/2, (button.get_height()-txt.get_height())/2))
+        self._surface = button
        
     def is_within_rect(self, pos:Vector2) -> bool:
         p = Vector2(pos)
         return (p.x > self.pos.x and p.x < self.pos.x+self.width and p.y > self.pos.y and p.y < self.pos.y+self.height)
     
-    def resize_txt(self, width:int, height:int) -> int:
-        w = (width/self.width)
-        h = (height/self.height)
+    # Keeps the current text size while the text fills between txt_size_ratio/2 and txt_size_ratio
+    # of the box, otherwise jumps straight to the size that fits instead of converging over frames.
+    def resize_txt(self, txt:str, width:int, height:int) -> int:
+        if width <= 0 or height <= 0: return self.txt_size
+        w, h = self.font.size(txt)
+        n = max(w/width, h/height)
         r = self.txt_size_ratio
-        if (max(w,h) > r) or (max(w,h) < r/2):
-            factor = r / max(w,h)
-            self.txt_size *= factor
+        if (n > r) or (n < r/2):
+            self.txt_size = fonts.fit_size(txt, width, height, r)
             self.font = fonts.txt_size(self.txt_size)
         return self.txt_size 
 
     #- PROPERTIES -#
     @property
     def txt(self) -> str:
-        return self._txt() if callable(self._txt) else self._txt
+        return bound_value(self, '_txt')
     @txt.setter
     def txt(self, txt:str):
         self._txt = txt
+        self._bound.pop('_txt', None)
 
     @property
     def pos(self) -> Vector2:
-        return Vector2(self._pos() if callable(self._pos) else self._pos)
+        return Vector2(bound_value(self, '_pos'))
     @pos.setter
     def pos(self, pos:Vector2):
         self._pos = pos
+        self._bound.pop('_pos', None)
 
     @property
     def width(self) -> int:
-        return int(self._width() if callable(self._width) else self._width)
+        return int(bound_value(self, '_width'))
     @width.setter
     def width(self, width:int):
         self._width = width
+        self._bound.pop('_width', None)
     
     @property
     def height(self) -> int:
-        return int(self._height() if callable(self._height) else self._height)
+        return int(bound_value(self, '_height'))
     @height.setter
     def height(self, height:int):
         self._height = height
+        self._bound.pop('_height', None)
 
     @property
     def fill_color(self) -> Color:
-        return self._fill_color() if callable(self._fill_color) else self._fill_color
+        return bound_value(self, '_fill_color')
     @fill_color.setter
     def fill_color(self, fill_color:Color|tuple):
         self._fill_color = fill_color
+        self._bound.pop('_fill_color', None)
 
     @property
     def txt_color(self) -> Color:
-        return self._txt_color() if callable(self._txt_color) else self._txt_color
+        return bound_value(self, '_txt_color')
     @txt_color.setter
     def txt_color(self, txt_color:Color|tuple):
         self._txt_color = txt_color
+        self._bound.pop('_txt_color', None)
 
     @property
     def out_color(self) -> Color:
-        return self._out_color() if callable(self._out_color) else self._out_color
+        return bound_value(self, '_out_color')
     @out_color.setter
     def out_color(self, out_color:Color|tuple):
         self._out_color = out_color
+        self._bound.pop('_out_color', None)
 
     @property
     def on_click(self):
@@ -292,7 +1045,63 @@ class Button():
     def on_hover(self, on_hover:lambda:()):
         self._on_hover = on_hover
 
-# TODO: add wrap text bool
+class TextLayout():
+    # Word wraps text to a pixel width, one paragraph (line of the source text) at a time.
+    # Wrapped paragraphs are memoized per (font, width, paragraph), and a paragraph that only had text
+    # appended since the last call (ex. a typewriter effect) is re-wrapped from the start of its last line.
+    def __init__(self, max_paragraphs:int=256):
+        self.max_paragraphs = max_paragraphs
+        self._paragraphs:OrderedDict = OrderedDict() # (font, width, paragraph) -> [(start, end)]
+        self._previous:dict = {} # (font, width, paragraph index) -> (paragraph, [(start, end)])
+
+    def lines(self, f:pygame.font.Font, txt:str, width:int) -> list:
+        lines = []
+        for i, paragraph in enumerate(txt.split('\n')):
+            lines.extend(paragraph[start:end] for start, end in self.wrap(f, paragraph, width, i))
+        return lines
+
+    # Returns the (start, end) offsets of each wrapped line of paragraph.
+    def wrap(self, f:pygame.font.Font, paragraph:str, width:int, index:int=0) -> list:
+        key = (f, width, paragraph)
+        spans = self._paragraphs.get(key)
+        if spans is not None:
+            self._paragraphs.move_to_end(key)
+        else:
+            previous = self._previous.get((f, width, index))
+            if previous is not None and len(previous[1]) > 1 and paragraph.startswith(previous[0]):
+                # appending text can only change the last line, the lines before it keep their breaks
+                spans = previous[1][:-1] + self._wrap(f, paragraph, width, previous[1][-1][0])
+            else:
+                spans = self._wrap(f, paragraph, width, 0)
+            self._paragraphs[key] = spans
+            if len(self._paragraphs) > self.max_paragraphs:
+                self._paragraphs.popitem(last=False)
+        self._previous[(f, width, index)] = (paragraph, spans)
+        return spans
+
+    def _wrap(self, f:pygame.font.Font, paragraph:str, width:int, start:int) -> list:
+        spans = []
+        line_start, line_end = start, None
+        for word in re.finditer(r'\S+', paragraph[start:]):
+            s, e = word.start() + start, word.end() + start
+            if line_end is not None and f.size(paragraph[line_start:e])[0] > width:
+                spans.append((line_start, line_end))
+                line_start, line_end = s, None
+            if line_end is None:
+                # a word too long for a line of its own is broken between characters
+                while e - line_start > 1 and f.size(paragraph[line_start:e])[0] > width:
+                    lo, hi = line_start + 1, e
+                    while hi - lo > 1:
+                        mid = (lo+hi)//2
+                        if f.size(paragraph[line_start:mid])[0] <= width: lo = mid
+                        else: hi = mid
+                    spans.append((line_start, lo))
+                    line_start = lo
+            line_end = e
+        spans.append((line_start, line_start if line_end is None else line_end))
+        return spans
+
+
 class TextBox():
     horizontal_alignment = {
         "left" : 0,
@@ -306,7 +1115,10 @@ class TextBox():
     }
 
     def __init__(self, txt:str, pos:Vector2, width:int, height:int, txt_color:Color|tuple, fill_color:Color|tuple, out_color:Color|tuple, 
-                 auto_txt_resize=True, h_align="left", v_align="center"):
+                 auto_txt_resize=True, h_align="left", v_align="center", wrap_txt=False, txt_size:int=None, glyph_atlas=False,
+                 skin:NineSlice=None):
+        self._bound:dict = {} # binding name -> (frame, value), see next_frame()
+        self._tick = 0 # frame tick stamped by the Hud drawing this widget, 0 outside of one
         self.txt = txt
         self.pos = pos # anchored to top left of rect
         
@@ -318,61 +1130,105 @@ class TextBox():
         self.auto_txt_resize = auto_txt_resize
         self.h_align = h_align
         self.v_align = v_align
+        # wrapped text keeps its size, auto_txt_resize only applies to single line text
+        self.wrap_txt = wrap_txt
+        self.layout = TextLayout()
+        # draw single line text from a shared glyph atlas, for text that changes every frame
+        self.glyph_atlas = glyph_atlas
+        # nine-slice skin drawn instead of the fill and outline
+        self.skin = skin
 
-        self.txt_size = self.height/2
+        self.txt_size = self.height/2 if txt_size is None else txt_size
         self.txt_size_ratio = 0.6
         self.font = fonts.txt_size(self.txt_size)
         self.out_width = 3
+        self._surface:Surface = None
+        self._state:tuple = None
+        self._version = 0
 
     #- METHODS -#
     def update(self, dt=0):
         pass
 
     def draw(self, surface:Surface):
-        # create button surface
-        fill_color = self.fill_color# if not self.hovering else colors.contrast_dark_light(self.fill_color)
-        out_color = self.out_color# if not self.hovering else colors.contrast_dark_light(self.out_color)
-        txt_color = self.txt_color# if not self.hovering else colors.contrast_dark_light(self.txt_color)
-        # if self.pressed:
-        #     fill_color = colors.dark(fill_color)
-        #     out_color = colors.step_to(out_color, fill_color, True)
-        #     txt_color = colors.step_to(txt_color, fill_color, True)
-        box = Surface((self.width, self.height), pygame.SRCALPHA)
-        box.fill(fill_color)
-
-        # add text box outline
-        pygame.draw.rect(box, out_color, (0,0, box.get_width(), box.get_height()), self.out_width)
+        self.refresh()
+        # blit text box to surface
+        surface.blit(self._surface, self.pos)
+
+    def get_blits(self) -> list:
+        return [(self._surface, self.pos)]
+
+    # Rebuilds the text box surface only if something it is drawn from changed since the last refresh.
+    def refresh(self) -> bool:
+        state = self._snapshot()
+        if state == self._state: return False
+        self._compose(*state[:6])
+        # composing can swap the font (auto resize), store the one the surface was drawn with
+        self._state = state[:-1] + (self.font,)
+        self._version += 1
+        return True
+
+    def invalidate(self):
+        self._state = None
+
+    # True if the next refresh() would rebuild the surface.
+    def is_stale(self) -> bool:
+        return self._snapshot() != self._state
+
+    def _snapshot(self) -> tuple:
+        return (self.txt, self.width, self.height, tuple(self.fill_color), tuple(self.out_color), tuple(self.txt_color),
+                self.h_align, self.v_align, self.out_width, self.auto_txt_resize, self.wrap_txt, self.glyph_atlas, self.txt_size_ratio, self.skin, self.font)
+
+    def _compose(self, txt_str:str, width:int, height:int, fill_color:tuple, out_color:tuple, txt_color:tuple):
+        release_surface(self._surface)
+        # create text box surface
+        box = new_surface((width, height))
+        if self.skin is not None:
+            box.blit(self.skin.render((width, height)), (0, 0), special_flags=pygame.BLEND_RGBA_MAX)
+        else:
+            box.fill(fill_color)
+
+            # add text box outline
+            pygame.draw.rect(box, out_color, (0,0, box.get_width(), box.get_height()), self.out_width)
 
         # add text box text
-        txt = self.font.render(self.txt, True, txt_color)
-        if self.auto_txt_resize: 
-            c=self.txt_size
-            n = self.resize_txt(txt.get_width(), txt.get_height())
-            if c != n: txt = self.font.render(self.txt, True, txt_color)
+        if self.wrap_txt:
+            # lines are rendered through the text cache, so only lines that changed are rasterized again
+            lines = [fonts.render(self.font, line, True, txt_color) for line in self.layout.lines(self.font, txt_str, width)]
+            line_height = self.font.get_linesize()
+            y = self.v_align * (box.get_height()-line_height*len(lines))
+            box.blits([(line, (self.h_align * (box.get_width()-line.get_width()), y + i*line_height)) for i, line in enumerate(lines)], False)
+            self._surface = box
+            return
+
+        if self.auto_txt_resize: self.resize_txt(txt_str, width, height)
+        if self.glyph_atlas:
+            atlas = fonts.glyph_atlas(self.font, txt_color)
+            w, h = atlas.size(txt_str)
+            atlas.blit_text(box, txt_str, (self.h_align * (box.get_width()-w), self.v_align * (box.get_height()-h)))
+            self._surface = box
+            return
+        txt = fonts.render(self.font, txt_str, True, txt_color)
         
         pos = Vector2(0)
         pos.x = self.h_align * (box.get_width()-txt.get_width())
         pos.y = self.v_align * (box.get_height()-txt.get_height())
         box.blit(txt, pos)
-
-        # blit button to surface
-        surface.blit(box, self.pos)
+        self._surface = box
        
     def is_within_rect(self, pos:Vector2) -> bool:
         p = Vector2(pos)
         return (p.x > self.pos.x and p.x < self.pos.x+self.width and p.y > self.pos.y and p.y < self.pos.y+self.height)
     
-    def resize_txt(self, width:int, height:int) -> int:
-        w = (width/self.width)
-        h = (height/self.height)
+    # Keeps the current text size while the text fills between txt_size_ratio/2 and txt_size_ratio
+    # of the box, otherwise jumps straight to the size that fits instead of converging over frames.
+    def resize_txt(self, txt:str, width:int, height:int) -> int:
+        if width <= 0 or height <= 0: return self.txt_size
+        w, h = self.font.size(txt)
+        n = max(w/width, h/height)
         r = self.txt_size_ratio
-        if (w > r or h > r):
-            factor = r / max(w,h)
-            self.txt_size *= factor
-            self.font = fonts.txt_size(self.txt_size)
-        elif(w < r/2 or h < r/2):
-            factor = r / max(w,h)
-            self.txt_size *= factor
+        if (n > r) or (n < r/2):
+            self.txt_size = fonts.fit_size(txt, width, height, r)
             self.font = fonts.txt_size(self.txt_size)
         return self.txt_size 
 
@@ -381,56 +1237,63 @@ class TextBox():
     #- PROPERTIES -#
     @property
     def txt(self) -> str:
-        s = self._txt() if callable(self._txt) else self._txt
+        s = bound_value(self, '_txt')
         if isinstance(s, str): return s
         else: return f"{s}"
          
     @txt.setter
     def txt(self, txt:str):
         self._txt = txt
+        self._bound.pop('_txt', None)
 
 
     @property
     def pos(self) -> Vector2:
-        return Vector2(self._pos() if callable(self._pos) else self._pos)
+        return Vector2(bound_value(self, '_pos'))
     @pos.setter
     def pos(self, pos:Vector2):
         self._pos = pos
+        self._bound.pop('_pos', None)
 
     @property
     def width(self) -> int:
-        return int(self._width() if callable(self._width) else self._width)
+        return int(bound_value(self, '_width'))
     @width.setter
     def width(self, width:int):
         self._width = width
+        self._bound.pop('_width', None)
     
     @property
     def height(self) -> int:
-        return int(self._height() if callable(self._height) else self._height)
+        return int(bound_value(self, '_height'))
     @height.setter
     def height(self, height:int):
         self._height = height
+        self._bound.pop('_height', None)
 
     @property
     def fill_color(self) -> Color:
-        return self._fill_color() if callable(self._fill_color) else self._fill_color
+        return bound_value(self, '_fill_color')
     @fill_color.setter
     def fill_color(self, fill_color:Color|tuple):
         self._fill_color = fill_color
+        self._bound.pop('_fill_color', None)
 
     @property
     def txt_color(self) -> Color:
-        return self._txt_color() if callable(self._txt_color) else self._txt_color
+        return bound_value(self, '_txt_color')
     @txt_color.setter
     def txt_color(self, txt_color:Color|tuple):
         self._txt_color = txt_color
+        self._bound.pop('_txt_color', None)
 
     @property
     def out_color(self) -> Color:
-        return self._out_color() if callable(self._out_color) else self._out_color
+        return bound_value(self, '_out_color')
     @out_color.setter
     def out_color(self, out_color:Color|tuple):
         self._out_color = out_color
+        self._bound.pop('_out_color', None)
 
     @property
     def txt_size(self) -> int:
@@ -461,7 +1324,594 @@ class TextBox():
             raise ValueError(f"Error: v_align must be a value in {self.vertical_alignment.keys()}. Given value: {v_align}.")
 
 
+class LogView():
+    # Scrolling log/console. Lines are kept in a ring buffer of max_lines and only the lines inside
+    # the viewport are rendered, each line's surface being kept while it is near the viewport. When the
+    # view scrolls, the previous frame is shifted with Surface.scroll() and only the strip that came
+    # into view is drawn. scroll() eases towards its target in update(), so scrolling is smooth.
+    def __init__(self, pos:Vector2, width:int, height:int, txt_color:Color|tuple, fill_color:Color|tuple, out_color:Color|tuple,
+                 max_lines:int=1000, txt_size:int=18, scroll_smoothing:float=12):
+        self.pos = Vector2(pos)
+        self.width = int(width)
+        self.height = int(height)
+        self.txt_color = txt_color
+        self.fill_color = fill_color
+        self.out_color = out_color
+        self.out_width = 3
+        self.padding = 6 # left margin of the text, clear of the outline
+        self.font = fonts.txt_size(txt_size)
+        self.line_height = self.font.get_linesize()
+        self.scroll_smoothing = scroll_smoothing
+
+        self.lines:deque = deque(maxlen=max_lines) # (txt, color)
+        self.total = 0 # lines ever pushed, line i sits at y = i*line_height in the log
+        self.scroll_y = 0.0
+        self.target_y = 0.0
+        self.follow = True # keep scrolling to new lines
+
+        self._rendered:dict = {} # line index -> rendered line, only for lines near the viewport
+        self._surface:Surface = None
+        self._frame:Surface = None
+        self._state:tuple = None
+        self._drawn_top:int = None
+        self._drawn_total = 0
+        self._version = 0
+
+    #- METHODS -#
+    def push(self, txt:str, color:Color|tuple=None):
+        for line in f"{txt}".split('\n'):
+            self.lines.append((line, color))
+            self.total += 1
+        if self.follow: self.target_y = self.bottom
+
+    def clear(self):
+        self.lines.clear()
+        self._rendered.clear()
+        self.total = 0
+        self.scroll_y = self.target_y = 0.0
+        self._state = None
+
+    def scroll(self, dy:float):
+        self.target_y = self._clamp(self.target_y + dy)
+        self.follow = self.target_y >= self.bottom
+
+    def scroll_to_end(self):
+        self.follow = True
+        self.target_y = self.bottom
+
+    @property
+    def first(self) -> int:
+        return self.total - len(self.lines)
+
+    @property
+    def bottom(self) -> float:
+        return max(self.first*self.line_height, self.total*self.line_height - self.height)
+
+    def update(self, dt=0):
+        self.target_y = self._clamp(self.target_y)
+        step = min(1.0, dt*self.scroll_smoothing) if self.scroll_smoothing else 1.0
+        self.scroll_y = self._clamp(self.scroll_y + (self.target_y - self.scroll_y)*step)
+        if abs(self.target_y - self.scroll_y) < 0.5: self.scroll_y = self.target_y
+
+    def draw(self, surface:Surface):
+        self.refresh()
+        surface.blits(self.get_blits(), False)
+
+    def get_blits(self) -> list:
+        return [(self._surface, self.pos), (self._frame, self.pos)]
+
+    def refresh(self) -> bool:
+        top = int(self._clamp(self.scroll_y))
+        state = (self.width, self.height, tuple(self.txt_color), tuple(self.fill_color), tuple(self.out_color), self.out_width, self.padding, self.font)
+        if state != self._state or self._drawn_top is None or abs(top - self._drawn_top) >= self.height:
+            self._state = state
+            self.line_height = self.font.get_linesize()
+            self._rendered.clear()
+            release_surface(self._surface)
+            release_surface(self._frame)
+            self._surface = new_surface((self.width, self.height))
+            self._frame = new_surface((self.width, self.height))
+            pygame.draw.rect(self._frame, self.out_color, self._frame.get_rect(), self.out_width)
+            dirty = [self._surface.get_rect()]
+        else:
+            dirty = []
+            shift = self._drawn_top - top
+            if shift:
+                self._surface.scroll(0, shift)
+                dirty.append(Rect(0, 0, self.width, shift) if shift > 0 else Rect(0, self.height + shift, self.width, -shift))
+            if self.total > self._drawn_total:
+                # new lines that landed inside the view
+                y = max(self._drawn_total*self.line_height - top, 0)
+                if y < self.height: dirty.append(Rect(0, y, self.width, self.height - y))
+        if not dirty and self.total == self._drawn_total: return False
+
+        for rect in dirty:
+            self._draw_region(rect, top)
+        self._drawn_top = top
+        self._drawn_total = self.total
+        # forget rendered lines that are more than a screen away from the view
+        keep_from, keep_to = (top - self.height)//self.line_height, (top + 2*self.height)//self.line_height
+        for i in [i for i in self._rendered if i < keep_from or i > keep_to]:
+            del self._rendered[i]
+        if dirty: self._version += 1
+        return bool(dirty)
+
+    def _clamp(self, y:float) -> float:
+        return min(max(y, self.first*self.line_height), self.bottom)
+
+    def _draw_region(self, rect:Rect, top:int):
+        self._surface.set_clip(rect)
+        self._surface.fill(self.fill_color, rect)
+        first = max(self.first, (top + rect.top)//self.line_height)
+        last = min(self.total - 1, (top + rect.bottom - 1)//self.line_height)
+        blits = []
+        for i in range(first, last + 1):
+            line = self._rendered.get(i)
+            if line is None:
+                txt, color = self.lines[i - self.first]
+                line = self._rendered[i] = self.font.render(txt, True, self.txt_color if color is None else color)
+            blits.append((line, (self.padding, i*self.line_height - top)))
+        self._surface.blits(blits, False)
+        self._surface.set_clip(None)
+
+
+# Pushes rect into a widget as plain values (Bar takes pos/size, everything else pos/width/height).
+def place(widget, rect:Rect):
+    widget.pos = Vector2(rect.topleft)
+    if isinstance(widget, Bar):
+        widget.size = Vector2(rect.size)
+    else:
+        widget.width = rect.w
+        widget.height = rect.h
+
+
+class Layout():
+    # Base for VBox, HBox and Grid. Child rects are computed when the layout is dirty and pushed into
+    # the widgets as plain values, so widgets don't need pos/size lambdas. Changing a layout's rect or
+    # a child's size hint marks that layout dirty and flags its parents, so layout() on the root only
+    # walks down the dirty branches, and nested layouts/widgets whose rect didn't change are skipped.
+    # layout() returns the widgets that moved or resized, ex. for InputRouter.move().
+    def __init__(self, rect:Rect=None, spacing:int=0, padding:int=0):
+        self.rect = Rect(rect) if rect is not None else Rect(0, 0, 0, 0)
+        self.spacing = spacing
+        self.padding = padding
+        self.parent:Layout = None
+        self._children:list = [] # [child, size hint]
+        self._placed:dict = {} # id(widget) -> rect last pushed into it
+        self._dirty = True
+        self._dirty_below = False
+
+    #- METHODS -#
+    # size is the child's size along the layout's axis in pixels, None shares the space left evenly.
+    def add(self, child, size:int=None):
+        self._children.append([child, size])
+        if isinstance(child, Layout): child.parent = self
+        self.mark_dirty()
+        return child
+
+    def remove(self, child):
+        self._children = [entry for entry in self._children if entry[0] is not child]
+        self._placed.pop(id(child), None)
+        if isinstance(child, Layout): child.parent = None
+        self.mark_dirty()
+
+    def resize(self, child, size:int=None):
+        for entry in self._children:
+            if entry[0] is child and entry[1] != size:
+                entry[1] = size
+                self.mark_dirty()
+
+    def set_rect(self, rect:Rect):
+        rect = Rect(rect)
+        if rect != self.rect:
+            self.rect = rect
+            self.mark_dirty()
+
+    def mark_dirty(self):
+        self._dirty = True
+        parent = self.parent
+        while parent is not None and not parent._dirty_below:
+            parent._dirty_below = True
+            parent = parent.parent
+
+    @property
+    def children(self) -> list:
+        return [child for child, _ in self._children]
+
+    # Leaf widgets of this layout and its nested layouts.
+    def widgets(self) -> list:
+        widgets = []
+        for child in self.children:
+            if isinstance(child, Layout): widgets += child.widgets()
+            else: widgets.append(child)
+        return widgets
+
+    def layout(self) -> list:
+        moved = []
+        if self._dirty:
+            self._dirty = False
+            for (child, _), rect in zip(self._children, self.child_rects()):
+                if isinstance(child, Layout):
+                    child.set_rect(rect)
+                elif self._placed.get(id(child)) != rect:
+                    self._placed[id(child)] = rect
+                    place(child, rect)
+                    moved.append(child)
+        for child, _ in self._children:
+            if isinstance(child, Layout) and (child._dirty or child._dirty_below):
+                moved += child.layout()
+        self._dirty_below = False
+        return moved
+
+    def child_rects(self) -> list:
+        return []
+
+    def inner_rect(self) -> Rect:
+        return self.rect.inflate(-2*self.padding, -2*self.padding)
+
+    # Splits length starting at start between the children: fixed sizes first, the rest shared by the
+    # children without one. Returns [(position, size)], rounded so the children tile without gaps.
+    def _distribute(self, start:int, length:int) -> list:
+        n = len(self._children)
+        if n == 0: return []
+        fixed = sum(size for _, size in self._children if size is not None)
+        stretch = sum(1 for _, size in self._children if size is None)
+        share = max(0, length - fixed - self.spacing*(n-1))/stretch if stretch else 0
+        spans = []
+        x = float(start)
+        for _, size in self._children:
+            end = x + (share if size is None else size)
+            spans.append((round(x), round(end) - round(x)))
+            x = end + self.spacing
+        return spans
+
+
+class VBox(Layout):
+    # Children stacked top to bottom, stretched to the layout's width.
+    def child_rects(self) -> list:
+        inner = self.inner_rect()
+        return [Rect(inner.x, y, inner.w, h) for y, h in self._distribute(inner.y, inner.h)]
+
+
+class HBox(Layout):
+    # Children side by side left to right, stretched to the layout's height.
+    def child_rects(self) -> list:
+        inner = self.inner_rect()
+        return [Rect(x, inner.y, w, inner.h) for x, w in self._distribute(inner.x, inner.w)]
+
+
+class Grid(Layout):
+    # Children in equal cells, filled row by row. Size hints are ignored.
+    def __init__(self, columns:int, rect:Rect=None, spacing:int=0, padding:int=0):
+        if columns < 1:
+            raise ValueError(f"Error: Grid needs at least 1 column. Given value: {columns}.")
+        super().__init__(rect, spacing, padding)
+        self.columns = columns
+
+    def child_rects(self) -> list:
+        inner = self.inner_rect()
+        n = len(self._children)
+        if n == 0: return []
+        rows = -(-n//self.columns)
+        w = (inner.w - self.spacing*(self.columns-1))/self.columns
+        h = (inner.h - self.spacing*(rows-1))/rows
+        rects = []
+        for i in range(n):
+            column, row = i % self.columns, i//self.columns
+            x, y = inner.x + column*(w + self.spacing), inner.y + row*(h + self.spacing)
+            rects.append(Rect(round(x), round(y), round(x+w) - round(x), round(y+h) - round(y)))
+        return rects
+
+
+# Moving average of a cost, starting from the first measurement.
+def average(mean:float, sample:float) -> float:
+    return sample if mean == 0 else 0.8*mean + 0.2*sample
+
+
+class Schedule():
+    # How often the Hud updates/refreshes one component, see Hud.
+    def __init__(self, refresh_interval:float=0, priority:int=0):
+        self.refresh_interval = refresh_interval
+        self.priority = priority
+        self.next_due = 0.0
+        self.last_update = 0.0
+        self.update_cost = 0.0 # moving averages in seconds
+        self.refresh_cost = 0.0
+
+    @property
+    def cost(self) -> float:
+        return self.update_cost + self.refresh_cost
+
+    # Priority raised by one level per refresh_interval (per second without one) the component is
+    # overdue, so components that are always due can't hold back lower priorities forever.
+    def effective_priority(self, time:float) -> float:
+        return self.priority + (time - self.next_due)/(self.refresh_interval or 1.0)
+
+
+class Hud():
+    # Draws Buttons, TextBoxes and Bars in z order with a single Surface.blits() call and returns
+    # the rects that changed since the last draw, for pygame.display.update(rects).
+    # With a background (Surface or color) the dirty rects are cleared before redrawing, without
+    # one the caller has to restore whatever is under the HUD itself (e.g. by redrawing the scene).
+    #
+    # Components can be given a refresh_interval (seconds) and a priority when added. update() picks
+    # the components that are due, highest priority first (raised the longer they're overdue, see
+    # Schedule.effective_priority) and then the longest waiting, and only those are updated and
+    # refreshed this frame; the others keep showing their cached surfaces. With a budget (seconds per
+    # frame) components are picked only while their measured update+refresh cost fits in it, so the
+    # rest wait for a later frame. Without calling update(), draw() refreshes everything.
+    def __init__(self, background:Surface|Color|tuple=None, budget:float=None):
+        self.background = background
+        self.budget = budget
+        self.time = 0.0
+        self._components:list = [] # (z, order added, component)
+        self._schedules:dict = {} # id(component) -> Schedule
+        self._due:list = None # components update() picked for this frame
+        self._drawn:dict = {} # id(component) -> (version, rects) as of the last draw
+        self._removed:list = []
+        self._order = itertools.count()
+        self._full_redraw = True
+        self._ticked = False # update() started this frame's tick
+
+    #- METHODS -#
+    def add(self, component, z:int=0, refresh_interval:float=0, priority:int=0):
+        self._components.append((z, next(self._order), component))
+        self._components.sort(key=lambda entry: entry[:2])
+        schedule = self._schedules[id(component)] = Schedule(refresh_interval, priority)
+        schedule.next_due = schedule.last_update = self.time
+
+    def remove(self, component):
+        self._components = [entry for entry in self._components if entry[2] is not component]
+        self._schedules.pop(id(component), None)
+        if hasattr(component, '_tick'): component._tick = 0
+        drawn = self._drawn.pop(id(component), None)
+        if drawn is not None: self._removed.extend(drawn[1])
+
+    def set_schedule(self, component, refresh_interval:float=0, priority:int=0):
+        schedule = self._schedules[id(component)]
+        schedule.refresh_interval = refresh_interval
+        schedule.priority = priority
+        schedule.next_due = min(schedule.next_due, self.time + refresh_interval)
+
+    def invalidate(self):
+        self._full_redraw = True
+
+    def update(self, dt):
+        self.time += dt
+        self._stamp()
+        self._ticked = True
+        self._due = self._pick_due()
+        for component in self._due:
+            schedule = self._schedules[id(component)]
+            start = time.perf_counter() if self.budget is not None else 0
+            component.update(self.time - schedule.last_update)
+            if self.budget is not None:
+                schedule.update_cost = average(schedule.update_cost, time.perf_counter() - start)
+            schedule.last_update = self.time
+            schedule.next_due = self.time + schedule.refresh_interval
+
+    # Due components in (effective priority, longest waiting) order, cut off once the budget is spent.
+    # At least one component is picked every frame, and waiting raises a component's effective
+    # priority, so nothing waits forever.
+    def _pick_due(self) -> list:
+        due = [(self._schedules[id(component)], component) for _, _, component in self._components
+               if self._schedules[id(component)].next_due <= self.time]
+        due.sort(key=lambda entry: (-entry[0].effective_priority(self.time), entry[0].next_due))
+        if self.budget is None: return [component for _, component in due]
+        picked = []
+        spent = 0.0
+        for schedule, component in due:
+            if picked and spent + schedule.cost > self.budget: break
+            picked.append(component)
+            spent += schedule.cost
+        return picked
+
+    # Starts a new frame tick (see next_frame()) unless update() did, so bound properties are
+    # evaluated once per frame.
+    def draw(self, surface:Surface) -> list:
+        if not self._ticked: self._stamp()
+        self._ticked = False
+        due = None if self._due is None else {id(component) for component in self._due}
+        self._due = None
+        entries = []
+        dirty = self._removed
+        self._removed = []
+        for _, _, component in self._components:
+            # components that weren't picked keep their cached surface, unless they were never drawn
+            drawn = self._drawn.get(id(component))
+            if due is None or id(component) in due or drawn is None:
+                if self.budget is not None:
+                    start = time.perf_counter()
+                    component.refresh()
+                    schedule = self._schedules[id(component)]
+                    schedule.refresh_cost = average(schedule.refresh_cost, time.perf_counter() - start)
+                else:
+                    component.refresh()
+            blits = component.get_blits()
+            rects = [Rect(blit[1], blit[2].clip(blit[0].get_rect()).size if len(blit) > 2 else blit[0].get_size()) for blit in blits]
+            if drawn is None or drawn[0] != component._version or drawn[1] != rects:
+                if drawn is not None: dirty.extend(drawn[1])
+                dirty.extend(rects)
+                self._drawn[id(component)] = (component._version, rects)
+            entries.append((blits, rects))
+
+        if self._full_redraw:
+            self._full_redraw = False
+            self._clear(surface, [surface.get_rect()])
+            surface.blits([blit for blits, _ in entries for blit in blits], False)
+            return [surface.get_rect()]
+        if not dirty: return []
+
+        # anything overlapping a dirty rect gets redrawn whole, which in turn dirties its own rects
+        redraw = [False]*len(entries)
+        grown = True
+        while grown:
+            grown = False
+            for i, (_, rects) in enumerate(entries):
+                if not redraw[i] and any(rect.collidelist(dirty) != -1 for rect in rects):
+                    redraw[i] = True
+                    dirty.extend(rects)
+                    grown = True
+
+        dirty = self._merge_rects(dirty)
+        self._clear(surface, dirty)
+        surface.blits([blit for i, (blits, _) in enumerate(entries) if redraw[i] for blit in blits], False)
+        return dirty
+
+    # Stamps the components with a new frame tick, see next_frame().
+    def _stamp(self):
+        tick = next_frame()
+        for _, _, component in self._components:
+            if hasattr(component, '_tick'): component._tick = tick
+
+    # Drops duplicate and empty rects and rects that lie inside another dirty rect.
+    def _merge_rects(self, rects:list) -> list:
+        unique = list({tuple(rect): rect for rect in rects if rect.w > 0 and rect.h > 0}.values())
+        return [rect for i, rect in enumerate(unique) if not any(j != i and other.contains(rect) for j, other in enumerate(unique))]
+
+    def _clear(self, surface:Surface, rects:list):
+        if self.background is None: return
+        for rect in rects:
+            if isinstance(self.background, Surface): surface.blit(self.background, rect, rect)
+            else: surface.fill(self.background, rect)
+
+
+class InputRouter():
+    # Routes pygame mouse events to the widgets under the cursor, instead of every Button polling
+    # the mouse each frame. Widgets are bucketed in a uniform grid of cell_size cells, so a hit test
+    # only checks the widgets in the cursor's cell. Call move(widget) after a widget moves or resizes.
+    # Hover and click callbacks only fire when the hovered/pressed widget actually changes.
+    def __init__(self, cell_size:int=64):
+        self.cell_size = cell_size
+        self.hovered = None
+        self.pressed = None
+        self._cells:dict = {} # (column, row) -> [widgets]
+        self._widgets:dict = {} # id(widget) -> (widget, (left, top, right, bottom), order added, cells)
+        self._order = itertools.count()
+
+    #- METHODS -#
+    # Adding a widget again brings it to the top and re-indexes it.
+    def add(self, widget):
+        entry = self._widgets.get(id(widget))
+        self._widgets[id(widget)] = (widget, None, next(self._order), entry[3] if entry is not None else [])
+        if hasattr(widget, 'input_router'): widget.input_router = self
+        self.move(widget)
+
+    def remove(self, widget):
+        entry = self._widgets.pop(id(widget), None)
+        if entry is None: return
+        for cell in entry[3]:
+            self._cells[cell].remove(widget)
+            if not self._cells[cell]: del self._cells[cell]
+        if widget is self.hovered: self._hover(None)
+        if widget is self.pressed: self.pressed = None
+        if hasattr(widget, 'input_router'): widget.input_router = None
+
+    # Re-reads the widget's pos and size and re-indexes it.
+    def move(self, widget):
+        _, _, order, cells = self._widgets[id(widget)]
+        for cell in cells:
+            self._cells[cell].remove(widget)
+            if not self._cells[cell]: del self._cells[cell]
+        pos = widget.pos
+        bounds = (pos.x, pos.y, pos.x + widget.width, pos.y + widget.height)
+        cs = self.cell_size
+        cells = [(column, row) for row in range(int(bounds[1]//cs), int(bounds[3]//cs) + 1)
+                               for column in range(int(bounds[0]//cs), int(bounds[2]//cs) + 1)]
+        for cell in cells:
+            self._cells.setdefault(cell, []).append(widget)
+        self._widgets[id(widget)] = (widget, bounds, order, cells)
+
+    # Returns the topmost (last added) widget containing pos, or None.
+    def widget_at(self, pos:tuple):
+        x, y = pos
+        top = None
+        for widget in self._cells.get((int(x//self.cell_size), int(y//self.cell_size)), ()):
+            _, (left, upper, right, lower), order, _ = self._widgets[id(widget)]
+            if left < x < right and upper < y < lower and (top is None or order > top[1]):
+                top = (widget, order)
+        return top[0] if top else None
+
+    def process(self, events:list):
+        for event in events:
+            self.handle_event(event)
+
+    def handle_event(self, event:Event):
+        if event.type == pygame.MOUSEMOTION:
+            self._hover(self.widget_at(event.pos))
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self._hover(self.widget_at(event.pos))
+            widget = self.hovered
+            if widget is not None and widget is not self.pressed:
+                self.pressed = widget
+                if hasattr(widget, 'pressed'): widget.pressed = True
+                if hasattr(widget, 'click'): widget.click()
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+            if self.pressed is not None:
+                if hasattr(self.pressed, 'pressed'): self.pressed.pressed = False
+                self.pressed = None
+        elif event.type == pygame.WINDOWLEAVE:
+            self._hover(None)
+
+    def _hover(self, widget):
+        if widget is self.hovered: return
+        old = self.hovered
+        self.hovered = widget
+        if old is not None:
+            if hasattr(old, 'hovering'): old.hovering = False
+            if hasattr(old, 'pressed'): old.pressed = False
+            if old is self.pressed: self.pressed = None
+        if widget is not None:
+            if hasattr(widget, 'hovering'): widget.hovering = True
+            if hasattr(widget, 'hover'): widget.hover()
+
 
+# Yields the Buttons and TextBoxes in tree: a widget, a Hud, a Layout, or a (nested) list of them.
+def iter_widgets(tree):
+    if isinstance(tree, Hud):
+        for _, _, component in tree._components:
+            yield from iter_widgets(component)
+    elif isinstance(tree, Layout):
+        yield from iter_widgets(tree.children)
+    elif isinstance(tree, (list, tuple, set)):
+        for item in tree:
+            yield from iter_widgets(item)
+    elif isinstance(tree, (Button, TextBox)):
+        yield tree
 
+# Fills the shared font and text caches for the first draw of every Button and TextBox in tree, on
+# the fonts prewarm thread pool. Returns a fonts.PrewarmJob to poll (progress) or wait() on.
+def prewarm(tree) -> fonts.PrewarmJob:
+    return fonts.submit([prewarm_task(widget) for widget in iter_widgets(tree)])
 
+# Bound properties and derived colors are read here on the calling thread. The task fits the text
+# size the same way resize_txt() will on the first draw and renders the text in every color the
+# widget can draw it in (buttons: normal, hover and pressed).
+def prewarm_task(widget):
+    txt, width, height = widget.txt, widget.width, widget.height
+    fill_color, txt_color = tuple(widget.fill_color), tuple(widget.txt_color)
+    txt_colors = [txt_color]
+    if isinstance(widget, Button):
+        hover_fill = colors.derived(colors.contrast_dark_light, fill_color)
+        hover_txt = colors.derived(colors.contrast_dark_light, txt_color)
+        txt_colors += [hover_txt, colors.derived(colors.step_to, hover_txt, colors.derived(colors.dark, hover_fill), True)]
+    f, ratio = widget.font, widget.txt_size_ratio
+    wrap = getattr(widget, 'wrap_txt', False)
+    resize = widget.auto_txt_resize and not wrap
+    atlas = widget.glyph_atlas and not wrap
 
+    def task():
+        font = f
+        if resize and width > 0 and height > 0:
+            w, h = font.size(txt)
+            n = max(w/width, h/height)
+            if n > ratio or n < ratio/2:
+                font = fonts.txt_size(fonts.fit_size(txt, width, height, ratio))
+        lines = TextLayout().lines(font, txt, width) if wrap else [txt]
+        for color in txt_colors:
+            if atlas:
+                fonts.glyph_atlas(font, color)
+                continue
+            for line in lines:
+                fonts.render(font, line, True, color)
+    return task
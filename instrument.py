@@ -0,0 +1,239 @@
+from pygame import Surface
+import fonts
+import hud_components
+from hud_components import Bar, Button, Camera, Hud, TextBox
+
+from collections import deque
+import time
+
+# Optional render instrumentation for the HUD components. enable() wraps the draw/refresh/update
+# methods of Button, TextBox, Bar, Camera and Hud, plus font creation, text rendering and surface
+# pool acquires (new allocations and reuses counted apart); disable() puts the original functions
+# back. While it is off nothing is wrapped, so leaving this module in a production build costs
+# nothing.
+#
+#   instrument.enable()
+#   ...
+#   for label, s in instrument.slowest(5): print(label, s.mean('draw'), s.renders)
+
+
+class ComponentStats():
+    def __init__(self, label:str, window:int):
+        self.label = label
+        self.times = {'draw': deque(maxlen=window), 'update': deque(maxlen=window)} # seconds per call
+        self.draws = 0
+        self.updates = 0
+        self.font_creations = 0
+        self.renders = 0
+        self.surfaces = 0 # surface pool misses, each one a new Surface
+        self.surface_reuses = 0 # surface pool hits
+        self.bytes_blitted = 0
+
+    def record(self, metric:str, seconds:float):
+        self.times[metric].append(seconds)
+        if metric == 'draw': self.draws += 1
+        else: self.updates += 1
+
+    # Mean time in ms over the rolling window.
+    def mean(self, metric:str='draw') -> float:
+        times = self.times[metric]
+        return 1000*sum(times)/len(times) if times else 0.0
+
+    def percentile(self, metric:str='draw', p:float=95) -> float:
+        times = sorted(self.times[metric])
+        if not times: return 0.0
+        return 1000*times[min(len(times)-1, int(len(times)*p/100))]
+
+    # Histogram of the rolling window as a list of (bin upper bound in ms, count).
+    def histogram(self, metric:str='draw', bins:int=10) -> list:
+        times = self.times[metric]
+        if not times: return []
+        top = max(times)
+        width = top/bins if top > 0 else 1
+        counts = [0]*bins
+        for t in times:
+            counts[min(bins-1, int(t/width))] += 1
+        return [(1000*width*(i+1), count) for i, count in enumerate(counts)]
+
+    def as_dict(self) -> dict:
+        return {
+            'draws': self.draws,
+            'updates': self.updates,
+            'draw_ms': self.mean('draw'),
+            'draw_p95_ms': self.percentile('draw'),
+            'update_ms': self.mean('update'),
+            'font_creations': self.font_creations,
+            'renders': self.renders,
+            'surfaces': self.surfaces,
+            'surface_reuses': self.surface_reuses,
+            'bytes_blitted': self.bytes_blitted,
+        }
+
+
+window = 120
+components:dict = {} # id(component) -> ComponentStats, id(None) collects work done outside a component
+excluded:set = set() # ids of components that aren't recorded (the overlay's own text boxes)
+_originals:list = [] # (owner, name, original) for everything enable() replaced
+_stack:list = [] # components currently drawing/updating, innermost last
+
+
+#- API -#
+def enable(window_size:int=120):
+    global window
+    if _originals: return
+    window = window_size
+    for cls in [Button, TextBox, Bar]:
+        _patch(cls, 'draw', _timed('draw', True))
+        _patch(cls, 'refresh', _timed('draw', False))
+        _patch(cls, 'update', _timed('update', False))
+    _patch(Camera, 'draw', _timed('draw', True))
+    _patch(Hud, 'draw', _timed_hud)
+    _patch(fonts.FontCache, '_create', _counted('font_creations'))
+    _patch(fonts.TextCache, 'render', _counted_renders)
+    _patch(hud_components.SurfacePool, 'acquire', _counted_acquires)
+
+def disable():
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+    _stack.clear()
+
+def enabled() -> bool:
+    return bool(_originals)
+
+def reset():
+    components.clear()
+
+def stats() -> dict:
+    return {s.label: s.as_dict() for s in components.values()}
+
+# Returns [(label, ComponentStats)] for the n components with the highest mean draw time.
+def slowest(n:int=5, metric:str='draw') -> list:
+    ranked = sorted(components.values(), key=lambda s: s.mean(metric), reverse=True)
+    return [(s.label, s) for s in ranked[:n]]
+
+
+#- WRAPPERS -#
+def _label(component) -> str:
+    if component is None: return '<other>'
+    txt = getattr(component, '_txt', None)
+    name = component.__class__.__name__
+    return f"{name}({txt!r})" if isinstance(txt, str) else f"{name}#{id(component):x}"
+
+def _stats_for(component) -> ComponentStats:
+    s = components.get(id(component))
+    if s is None:
+        s = components[id(component)] = ComponentStats(_label(component), window)
+    return s
+
+def _current() -> ComponentStats:
+    return _stats_for(_stack[-1] if _stack else None)
+
+def _patch(owner, name:str, make_wrapper):
+    original = getattr(owner, name)
+    _originals.append((owner, name, original))
+    setattr(owner, name, make_wrapper(original))
+
+def _blit_bytes(component, args:tuple) -> int:
+    if isinstance(component, Camera):
+        return component.width * component.height * args[0].get_bytesize()
+    n = 0
+    for blit in component.get_blits():
+        w, h = blit[2].size if len(blit) > 2 else blit[0].get_size()
+        n += max(w, 0) * max(h, 0) * blit[0].get_bytesize()
+    return n
+
+def _timed(metric:str, blits:bool):
+    def make_wrapper(original):
+        def wrapper(self, *args, **kwargs):
+            # draw() calls refresh(), only the outer call is timed
+            if (_stack and _stack[-1] is self) or id(self) in excluded:
+                return original(self, *args, **kwargs)
+            _stack.append(self)
+            start = time.perf_counter()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                _stack.pop()
+                s = _stats_for(self)
+                s.record(metric, elapsed)
+                if blits: s.bytes_blitted += _blit_bytes(self, args)
+        return wrapper
+    return make_wrapper
+
+def _timed_hud(original):
+    def wrapper(self, surface:Surface) -> list:
+        _stack.append(self)
+        start = time.perf_counter()
+        try:
+            rects = original(self, surface)
+        finally:
+            elapsed = time.perf_counter() - start
+            _stack.pop()
+        s = _stats_for(self)
+        s.record('draw', elapsed)
+        # the Hud only redraws its dirty rects, so those are what it blitted
+        s.bytes_blitted += sum(rect.w * rect.h for rect in rects) * surface.get_bytesize()
+        return rects
+    return wrapper
+
+def _counted(counter:str):
+    def make_wrapper(original):
+        def wrapper(*args, **kwargs):
+            s = _current()
+            setattr(s, counter, getattr(s, counter) + 1)
+            return original(*args, **kwargs)
+        return wrapper
+    return make_wrapper
+
+def _counted_renders(original):
+    def wrapper(self, *args, **kwargs):
+        misses = self.misses
+        surf = original(self, *args, **kwargs)
+        # cache hits don't call font.render
+        _current().renders += self.misses - misses
+        return surf
+    return wrapper
+
+def _counted_acquires(original):
+    def wrapper(self, *args, **kwargs):
+        misses, hits = self.misses, self.hits
+        surf = original(self, *args, **kwargs)
+        s = _current()
+        s.surfaces += self.misses - misses
+        s.surface_reuses += self.hits - hits
+        return surf
+    return wrapper
+
+
+class StatsOverlay():
+    # On-screen table of the slowest components, drawn with TextBoxes and refreshed every interval seconds.
+    def __init__(self, pos:tuple, width:int=420, row_height:int=20, rows:int=6, interval:float=0.5,
+                 txt_color:tuple=(255,255,255), fill_color:tuple=(0,0,0,180), out_color:tuple=(0,0,0,0)):
+        self.interval = interval
+        self.elapsed = interval
+        self.rows = [TextBox("", (pos[0], pos[1] + i*row_height), width, row_height, txt_color, fill_color, out_color, auto_txt_resize=False)
+                     for i in range(rows+1)]
+        for row in self.rows:
+            row.out_width = 0
+            row.font = fonts.txt_size(row_height*0.8)
+            excluded.add(id(row))
+        self.rows[0].txt = "component  draw ms (avg/p95)  renders  fonts  surfaces (new/reused)"
+
+    #- METHODS -#
+    def update(self, dt:float):
+        self.elapsed += dt
+        if self.elapsed < self.interval: return
+        self.elapsed = 0
+        ranked = [(label, s) for label, s in slowest(len(self.rows)) if s.draws][:len(self.rows)-1]
+        for i, row in enumerate(self.rows[1:]):
+            if i < len(ranked):
+                label, s = ranked[i]
+                row.txt = f"{label[:28]}  {s.mean('draw'):.2f}/{s.percentile('draw'):.2f}  {s.renders}  {s.font_creations}  {s.surfaces}/{s.surface_reuses}"
+            else:
+                row.txt = ""
+
+    def draw(self, surface:Surface):
+        for row in self.rows:
+            row.draw(surface)
@@ -0,0 +1,80 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import random
+
+import pytest
+np = pytest.importorskip('numpy')
+import pygame
+
+import hud_components as hud
+
+# BarBatch has to draw exactly what the same Bars drawn one by one would.
+
+
+def draw_both(configs:list) -> tuple:
+    singles = pygame.Surface((400, 300))
+    batched = pygame.Surface((400, 300))
+    batch = hud.BarBatch(len(configs))
+    for args in configs:
+        hud.Bar(*args).draw(singles)
+        batch.add(*args)
+    batch.draw(batched)
+    return (pygame.image.tobytes(singles, 'RGB'), pygame.image.tobytes(batched, 'RGB'))
+
+def random_config(rng:random.Random, anchor:str, direction:str, split:bool) -> tuple:
+    pos = (rng.uniform(0, 350), rng.uniform(0, 250))
+    size = (rng.choice([30, 41.5, 60, rng.uniform(5, 90)]), rng.choice([8, 13, 20, rng.uniform(3, 40)]))
+    max_value = rng.choice([1, 3, 7, 100])
+    value = rng.uniform(-1.5*max_value, 1.5*max_value)
+    color = rng.choice([(255, 0, 0), (0, 255, 0, 128), (10, 20, 200)])
+    return (pos, size, max_value, value, anchor, direction, split, (255, 255, 255), 1, color)
+
+@pytest.mark.parametrize('split', [False, True])
+@pytest.mark.parametrize('direction', list(hud.Bar.fill_directions))
+@pytest.mark.parametrize('anchor', list(hud.Bar.bar_anchors))
+def test_barbatch_matches_bar(anchor, direction, split):
+    rng = random.Random(f"{anchor}{direction}{split}")
+    for _ in range(20):
+        configs = [random_config(rng, anchor, direction, split) for _ in range(5)]
+        singles, batched = draw_both(configs)
+        assert singles == batched, configs
+
+def test_barbatch_fill_rects_match_bar():
+    rng = random.Random(7)
+    batch = hud.BarBatch(3000)
+    bars = []
+    for _ in range(3000):
+        args = random_config(rng, rng.choice(list(hud.Bar.bar_anchors)), rng.choice(list(hud.Bar.fill_directions)), rng.random() < 0.5)
+        bars.append(hud.Bar(*args))
+        batch.add(*args)
+    pos, size = batch.fill_rects()
+    for i, bar in enumerate(bars):
+        bar_pos, bar_size = bar.fill_rect
+        assert tuple(pos[i]) == (bar_pos.x, bar_pos.y)
+        assert tuple(size[i]) == (bar_size.x, bar_size.y)
+
+def test_barbatch_arrays_are_never_replaced():
+    batch = hud.BarBatch(2)
+    value = batch.value
+    batch.add((0, 0), (10, 4))
+    batch.add((0, 10), (10, 4))
+    with pytest.raises(ValueError):
+        batch.add((0, 20), (10, 4))
+    assert batch.value is value
+
+def test_barbatch_draws_in_a_hud():
+    batch = hud.BarBatch(10)
+    for i in range(5):
+        batch.add((10, 10 + 30*i), (100, 20), 10, 5)
+    screen = pygame.Surface((400, 300))
+    h = hud.Hud((0, 0, 0))
+    h.add(batch)
+    h.draw(screen)
+    assert h.draw(screen) == []
+    batch.value[2] = 8
+    assert h.draw(screen)
+    expected = pygame.Surface((400, 300))
+    batch.draw(expected)
+    assert pygame.image.tobytes(screen, 'RGB') == pygame.image.tobytes(expected, 'RGB')
@@ -0,0 +1,44 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+import hud_components as hud
+
+# Bound callables are cached per frame tick only for widgets a Hud (or next_frame(tree)) stamps.
+
+def label(txt, pos=(0, 0)) -> hud.TextBox:
+    return hud.TextBox(txt, pos, 200, 40, (255, 255, 255), (0, 0, 0), (0, 0, 0))
+
+def test_widget_outside_a_hud_is_not_cached():
+    pygame.font.init()
+    screen = pygame.Surface((400, 300))
+    score = [40]
+    standalone = label(lambda: f"score {score[0]}")
+    menu = hud.Hud()
+    menu.add(label("menu", (0, 100)))
+    standalone.draw(screen)
+    menu.draw(screen)
+    score[0] = 60
+    assert standalone.txt == "score 60"
+
+def test_hud_calls_bindings_once_per_frame():
+    pygame.font.init()
+    screen = pygame.Surface((400, 300))
+    calls = [0]
+    def txt():
+        calls[0] += 1
+        return "hp"
+    widget = label(txt)
+    h = hud.Hud()
+    h.add(widget)
+    for _ in range(3):
+        calls[0] = 0
+        h.update(0.016)
+        h.draw(screen)
+        assert calls[0] == 1
+    h.remove(widget)
+    calls[0] = 0
+    widget.txt, widget.txt
+    assert calls[0] == 2
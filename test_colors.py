@@ -0,0 +1,51 @@
+import random
+
+import pytest
+np = pytest.importorskip('numpy')
+
+import colors
+
+# The array functions have to give what the scalar ones give for every color in the array.
+
+def random_colors(rng:random.Random, n:int, channels:int) -> list:
+    return [tuple(rng.randrange(256) for _ in range(channels)) for _ in range(n)]
+
+def expected(func, colors_list:list, *args) -> np.ndarray:
+    return np.array([tuple(func(c, *args)) for c in colors_list])
+
+@pytest.mark.parametrize('channels', [3, 4])
+@pytest.mark.parametrize('func, array_func, args', [
+    (colors.lighten, colors.lighten_array, (0.3,)),
+    (colors.darken, colors.darken_array, (0.7,)),
+    (colors.contrast_dark_light, colors.contrast_dark_light_array, ()),
+    (colors.contrast_color, colors.contrast_color_array, ()),
+    (colors.max_bright, colors.max_bright_array, ()),
+])
+def test_array_matches_scalar(func, array_func, args, channels):
+    rng = random.Random(f"{func.__name__}{channels}")
+    # the scalar max_bright divides by the brightest channel, so black is left out
+    cs = [c for c in random_colors(rng, 1000, channels) if max(c[:3]) > 0]
+    result = array_func(np.array(cs, dtype=np.uint8), *args)
+    assert (result == expected(func, cs, *args)[:, :channels]).all()
+
+def test_luminance_array_matches_scalar():
+    cs = random_colors(random.Random(1), 1000, 4)
+    assert np.allclose(colors.get_luminance_array(np.array(cs)), [colors.get_luminance(c) for c in cs])
+
+@pytest.mark.parametrize('luminance_only', [False, True])
+@pytest.mark.parametrize('from_channels, to_channels', [(3, 3), (3, 4), (4, 3), (4, 4)])
+def test_step_to_array_matches_scalar(from_channels, to_channels, luminance_only):
+    rng = random.Random(f"{from_channels}{to_channels}{luminance_only}")
+    fs = random_colors(rng, 1000, from_channels)
+    ts = random_colors(rng, 1000, to_channels)
+    result = colors.step_to_array(np.array(fs, dtype=np.uint8), np.array(ts, dtype=np.uint8), luminance_only)
+    want = np.array([tuple(colors.step_to(f, t, luminance_only)) for f, t in zip(fs, ts)])
+    assert (result == want[:, :from_channels]).all()
+
+def test_step_to_array_broadcasts_one_color():
+    ts = random_colors(random.Random(2), 50, 3)
+    result = colors.step_to_array((200, 100, 50, 0), np.array(ts, dtype=np.uint8))
+    assert result.shape == (50, 4)
+    assert (result == [tuple(colors.step_to((200, 100, 50, 0), t)) for t in ts]).all()
+    result = colors.step_to_array(np.array(ts, dtype=np.uint8), colors.midnight)
+    assert (result == [tuple(colors.step_to(t, colors.midnight))[:3] for t in ts]).all()
@@ -0,0 +1,37 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+import hud_components as hud
+
+# A skin's colorkey and surface alpha have to survive the split, and any bit depth can be scaled.
+
+def skin(depth:int=0) -> pygame.Surface:
+    if depth == 8:
+        s = pygame.Surface((30, 30), depth=8)
+        s.set_palette([(k, k, 0) for k in range(256)])
+        s.fill(90)
+        return s
+    s = pygame.Surface((30, 30))
+    s.fill((200, 0, 0))
+    s.fill((0, 0, 255), (10, 10, 10, 10))
+    return s
+
+def test_colorkey_is_transparent():
+    s = skin()
+    s.set_colorkey((200, 0, 0))
+    surf = hud.NineSlice(s, 10).render((60, 50))
+    assert surf.get_at((0, 0)).a == 0
+    assert surf.get_at((30, 25)) == (0, 0, 255, 255)
+
+def test_surface_alpha_is_kept():
+    s = skin()
+    s.set_alpha(128)
+    surf = hud.NineSlice(s, 10).render((60, 50))
+    assert surf.get_at((0, 0)) == (200, 0, 0, 128)
+
+def test_smooth_scales_8_bit_skins():
+    surf = hud.NineSlice(skin(8), 10, smooth=True).render((80, 70))
+    assert surf.get_at((40, 35)) == (90, 90, 0, 255)
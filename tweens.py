@@ -0,0 +1,171 @@
+import numpy as np
+
+# Batched tweens. Every active animation is a row in a set of contiguous arrays (start, end,
+# elapsed, duration, easing id) and Tweener.step() advances all of them in one vectorized pass,
+# then writes the values back and retires the finished ones.
+#
+# Targets can be
+#   - an object attribute:  tweener.tween(bar, 'curr_value', 0, 1.5, 'ease_out')
+#                           tweener.tween(button, 'fill_color', colors.red, 0.3)
+#   - a numpy array entry:  tweener.tween(values, 12, 0, 1.5)   (values[12] = ...)
+#   - a callable:           tweener.tween(set_volume, None, 0, 2, start=1)
+# Array targets are written back with one np.put() per array, so animating an array of values
+# (ex. thousands of bar values) costs a few numpy calls per frame instead of one Python call each.
+
+easings = {
+    'linear': 0,
+    'ease_in': 1,
+    'ease_out': 2,
+    'ease_in_out': 3,
+    'smoothstep': 4,
+}
+
+def ease(t:np.ndarray, easing:np.ndarray) -> np.ndarray:
+    return np.select(
+        [easing == 1, easing == 2, easing == 3, easing == 4],
+        [t*t, 1 - (1-t)**2, np.where(t < 0.5, 2*t*t, 1 - (2 - 2*t)**2/2), t*t*(3 - 2*t)],
+        default=t)
+
+
+class Tweener():
+    OBJECT = 0
+    CALLABLE = 1
+    ARRAY = 2
+
+    def __init__(self, capacity:int=64):
+        self.count = 0
+        self.start = np.zeros((capacity, 4))
+        self.end = np.zeros((capacity, 4))
+        self.elapsed = np.zeros(capacity)
+        self.duration = np.ones(capacity)
+        self.easing = np.zeros(capacity, dtype=np.int8)
+        self.channels = np.ones(capacity, dtype=np.int8)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.array_slot = np.zeros(capacity, dtype=np.int64) # index into self._arrays for ARRAY rows
+        self.flat_index = np.zeros(capacity, dtype=np.int64) # flat index of the first channel for ARRAY rows
+        self.targets:list = [] # (target, key, on_done) per row
+        self._rows:dict = {} # (id(target), key) -> row
+        self._arrays:list = []
+
+    #- METHODS -#
+    def tween(self, target, key, end, duration:float, easing:str='linear', start=None, on_done=None):
+        if easing not in easings:
+            raise ValueError(f"Error: easing must be a value in {easings.keys()}. Given value: {easing}.")
+        kind, flat, slot = self._target_kind(target, key)
+        if start is None:
+            if kind == self.CALLABLE:
+                raise ValueError("Error: tweens of a callable need a start value.")
+            start = target[key] if kind == self.ARRAY else getattr(target, key)
+        start = self._values(start)
+        end = self._values(end)
+        if len(start) != len(end):
+            raise ValueError(f"Error: start and end need the same number of channels. Given values: {start}, {end}.")
+
+        # a new tween of the same target replaces the running one
+        row = self._rows.get((id(target), key))
+        if row is None:
+            row = self.count
+            self._reserve(row + 1)
+            self.count += 1
+            self.targets.append((target, key, on_done))
+            self._rows[(id(target), key)] = row
+        else:
+            self.targets[row] = (target, key, on_done)
+        self.start[row, :len(start)] = start
+        self.end[row, :len(end)] = end
+        self.elapsed[row] = 0
+        self.duration[row] = max(duration, 1e-9)
+        self.easing[row] = easings[easing]
+        self.channels[row] = len(start)
+        self.kind[row] = kind
+        self.flat_index[row] = flat
+        self.array_slot[row] = slot
+
+    def cancel(self, target, key=None):
+        row = self._rows.get((id(target), key))
+        if row is not None:
+            keep = np.ones(self.count, dtype=bool)
+            keep[row] = False
+            self._compact(keep)
+
+    def clear(self):
+        self.count = 0
+        self.targets.clear()
+        self._rows.clear()
+        self._arrays.clear()
+
+    @property
+    def active(self) -> int:
+        return self.count
+
+    def step(self, dt:float):
+        n = self.count
+        if n == 0: return
+        self.elapsed[:n] += dt
+        t = np.minimum(self.elapsed[:n] / self.duration[:n], 1.0)
+        values = self.start[:n] + (self.end[:n] - self.start[:n]) * ease(t, self.easing[:n])[:, np.newaxis]
+        self._write(values)
+
+        done = t >= 1.0
+        if done.any():
+            finished = [self.targets[i] for i in np.flatnonzero(done)]
+            self._compact(~done)
+            for _, _, on_done in finished:
+                if on_done is not None: on_done()
+
+    #- HELPERS -#
+    def _values(self, value) -> list:
+        if isinstance(value, (int, float, np.number)): return [float(value)]
+        return [float(v) for v in value]
+
+    def _target_kind(self, target, key) -> tuple:
+        if isinstance(target, np.ndarray):
+            index = key if isinstance(key, tuple) else (key,)
+            index = index + (0,)*(target.ndim - len(index))
+            flat = int(np.ravel_multi_index(index, target.shape))
+            for slot, array in enumerate(self._arrays):
+                if array is target: return (self.ARRAY, flat, slot)
+            self._arrays.append(target)
+            return (self.ARRAY, flat, len(self._arrays)-1)
+        if key is None and callable(target):
+            return (self.CALLABLE, 0, 0)
+        return (self.OBJECT, 0, 0)
+
+    def _write(self, values:np.ndarray):
+        kinds = self.kind[:self.count]
+        array_rows = kinds == self.ARRAY
+        if array_rows.any():
+            for slot, array in enumerate(self._arrays):
+                in_array = array_rows & (self.array_slot[:self.count] == slot)
+                if not in_array.any(): continue
+                # rows can target entries with different channel counts (ex. a[0] and a[2, 0])
+                for channels in np.unique(self.channels[:self.count][in_array]):
+                    rows = np.flatnonzero(in_array & (self.channels[:self.count] == channels))
+                    flat = (self.flat_index[rows][:, np.newaxis] + np.arange(channels)).ravel()
+                    np.put(array, flat, values[rows, :channels].ravel())
+        for i in np.flatnonzero(~array_rows):
+            target, key, _ = self.targets[i]
+            channels = self.channels[i]
+            value = float(values[i, 0]) if channels == 1 else tuple(int(v) for v in values[i, :channels])
+            if kinds[i] == self.CALLABLE: target(value)
+            else: setattr(target, key, value)
+
+    def _compact(self, keep:np.ndarray):
+        n = self.count
+        m = int(keep.sum())
+        for array in [self.start, self.end, self.elapsed, self.duration, self.easing, self.channels, self.kind, self.array_slot, self.flat_index]:
+            array[:m] = array[:n][keep]
+        self.count = m
+        self.targets = [target for target, k in zip(self.targets, keep) if k]
+        self._rows = {(id(target), key): row for row, (target, key, _) in enumerate(self.targets)}
+        if m == 0: self._arrays.clear()
+
+    def _reserve(self, size:int):
+        capacity = len(self.elapsed)
+        if size <= capacity: return
+        capacity = max(size, capacity*2)
+        for name in ['start', 'end', 'elapsed', 'duration', 'easing', 'channels', 'kind', 'array_slot', 'flat_index']:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)